@@ -0,0 +1,95 @@
+"""
+Fails (exit 1) if a hot query's SQLite plan falls back to a full table scan.
+
+    python benchmarks/check_query_plans.py
+
+Runs EXPLAIN QUERY PLAN for the planner, voice, reminder, burnout, habit and Insights queries
+against a scratch database built from the current models, so it is safe to run
+in CI. Every query is scoped to one user, as the routes and jobs issue them.
+"""
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'plans.db')}"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.dialects import sqlite  # noqa: E402
+
+from database import engine, init_db  # noqa: E402
+from engines.recurrence import materialized_query, open_series_query  # noqa: E402
+import models  # noqa: E402
+
+now = datetime.utcnow()
+user_id = models.DEFAULT_USER_ID
+
+HOT_QUERIES = {
+    "planner: open tasks due this week": select(models.Task).where(
+        models.Task.user_id == user_id,
+        models.Task.completed == False,
+        models.Task.deadline >= now,
+        models.Task.deadline <= now + timedelta(days=7)
+    ),
+    "voice: three pending tasks": select(models.Task).where(
+        models.Task.user_id == user_id,
+        models.Task.completed == False
+    ).limit(3),
+    "reminders: open tasks by deadline": select(models.Task.title).where(
+        models.Task.user_id == user_id,
+        models.Task.completed == False
+    ).order_by(models.Task.deadline),
+    "burnout: newest unused reflection": select(models.UserReflection).where(
+        models.UserReflection.user_id == user_id,
+        models.UserReflection.used_in_suggestions == False
+    ).order_by(models.UserReflection.date.desc()).limit(1),
+    "tasks: keyset page": select(models.Task).where(
+        models.Task.user_id == user_id,
+        models.Task.created_at > now
+    ).order_by(models.Task.created_at, models.Task.id).limit(100),
+    "tasks: delta sync": select(models.Task).where(
+        models.Task.user_id == user_id, models.Task.updated_at > now
+    ),
+    "tasks: deleted since": select(models.TaskTombstone).where(
+        models.TaskTombstone.user_id == user_id, models.TaskTombstone.deleted_at > now
+    ),
+    "insights: weekly completions": select(models.CompletionRollup).where(
+        models.CompletionRollup.user_id == user_id,
+        models.CompletionRollup.period == "week",
+        models.CompletionRollup.period_start >= (now - timedelta(weeks=8)).date()
+    ),
+    "archiver: finished before cutoff": select(models.Task.id).where(
+        models.Task.completed == True,
+        models.Task.completed_at < now - timedelta(days=30)
+    ).order_by(models.Task.completed_at).limit(1000),
+    "recurrence: open habit series": open_series_query(user_id),
+    "recurrence: saved occurrences this week": materialized_query(
+        ["series-1", "series-2"], now, now + timedelta(days=7)
+    ),
+    "timeline: busy blocks": select(models.BusyBlock).where(
+        models.BusyBlock.user_id == user_id,
+        models.BusyBlock.end > now,
+        models.BusyBlock.start < now + timedelta(days=7)
+    ),
+}
+
+# "SCAN tasks" with no index is a full table scan; "SCAN tasks USING INDEX ..." is fine
+FULL_SCAN = re.compile(r"\bSCAN \w+(?!\w)(?! USING)")
+
+def main() -> int:
+    init_db()
+    failures = 0
+    with engine.connect() as conn:
+        for name, query in HOT_QUERIES.items():
+            sql = str(query.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+            plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+            scans = [step for step in plan if FULL_SCAN.search(step)]
+            status = "FULL SCAN" if scans else "ok"
+            failures += bool(scans)
+            print(f"[{status:>9}] {name}: {' | '.join(plan)}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Fails (exit 1) if a habit occurrence's id stops round-tripping to its series.
+
+    python benchmarks/check_recurrence.py
+
+Expands a few series, including ones whose deadline carries milliseconds the way
+the app's toISOString() deadlines do, and checks that every occurrence id parses
+back to a time the series still recognises, and that EXDATEs and saved rows drop
+the occurrence again. Pure Python: no database is touched.
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from engines import recurrence  # noqa: E402
+
+def series(rule: str, deadline: datetime) -> SimpleNamespace:
+    return SimpleNamespace(
+        id="series-1", user_id="default", title="Gym", description=None, deadline=deadline,
+        priority="medium", category="habit", created_at=deadline, updated_at=deadline,
+        estimated_minutes=30, recurrence=rule,
+    )
+
+CASES = {
+    "daily, whole seconds": series("FREQ=DAILY", datetime(2026, 10, 1, 9, 0)),
+    "daily, milliseconds": series("FREQ=DAILY", datetime(2026, 10, 1, 9, 0, 0, 562000)),
+    "weekly BYDAY, milliseconds": series("FREQ=WEEKLY;BYDAY=MO,WE,FR", datetime(2026, 10, 5, 7, 30, 15, 999000)),
+    "monthly, milliseconds": series("FREQ=MONTHLY", datetime(2026, 1, 31, 18, 0, 0, 1000)),
+}
+
+def check(name: str, habit) -> list:
+    problems = []
+    start = habit.deadline.replace(microsecond=0)
+    occurrences = recurrence.expand([habit], start, start + timedelta(days=62), set())
+    if not occurrences:
+        return [f"{name}: nothing expanded"]
+    for occurrence in occurrences:
+        parsed = recurrence.parse_occurrence_id(occurrence.id)
+        if parsed != (habit.id, occurrence.deadline):
+            problems.append(f"{name}: {occurrence.id} parsed as {parsed}")
+        elif not recurrence.is_occurrence(habit, parsed[1]):
+            problems.append(f"{name}: {occurrence.id} is not recognised as an occurrence")
+
+    # Deleting and saving an occurrence both have to take it out of the expansion
+    first = occurrences[0]
+    excluded = series(recurrence.add_exdate(habit.recurrence, first.deadline), habit.deadline)
+    if recurrence.is_occurrence(excluded, first.deadline):
+        problems.append(f"{name}: EXDATE didn't exclude {first.id}")
+    saved = recurrence.expand([habit], start, start + timedelta(days=62), {(habit.id, first.deadline)})
+    if first.id in {o.id for o in saved}:
+        problems.append(f"{name}: saved occurrence {first.id} still expanded")
+    return problems
+
+def main() -> int:
+    failures = 0
+    for name, habit in CASES.items():
+        problems = check(name, habit)
+        failures += bool(problems)
+        print(f"[{'FAIL' if problems else 'ok':>4}] {name}")
+        for problem in problems:
+            print(f"       {problem}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Synthetic tasks and voice reflections for benchmarks, 1k to 1M rows.
+
+    python benchmarks/datagen.py --tasks 100000 --reflections 1000
+    python benchmarks/datagen.py --tasks 1000000 --users 1000
+
+Writes into DATABASE_URL with multi-row INSERTs, then rebuilds the workload and
+completion rollups so the engines see the new tasks. With --users, rows are dealt
+round-robin across that many accounts (the default user first). Seeded, so two
+runs with the same --seed produce the same rows.
+"""
+import argparse
+import os
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+CHUNK = 20_000
+TITLES = ["Finish report", "Gym session", "Read chapter", "Call mom", "Lab assignment",
+          "Pay rent", "Review PR", "Meditate", "Grocery run", "Prepare slides"]
+NOTES = ["Move my gym session to the morning", "I have an exam on Friday, keep tomorrow light",
+         "Push the report to next week", "Add time to revise chapter four", "Nothing new for tomorrow"]
+
+def user_ids(users: int) -> list:
+    import models
+
+    return [models.DEFAULT_USER_ID] + [f"bench-user-{n:06d}" for n in range(1, users)]
+
+def task_rows(count: int, rng: random.Random, now: datetime, start: int = 0, owners: list = None):
+    """Yields task dicts spread over the past week and the next two weeks."""
+    owners = owners or user_ids(1)
+    # One second apart in creation order, so keyset pages walk them in sequence
+    epoch = now - timedelta(days=30)
+    for i in range(start, start + count):
+        completed = rng.random() < 0.3
+        yield {
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "user_id": owners[i % len(owners)],
+            "title": f"{rng.choice(TITLES)} #{i}",
+            "deadline": now + timedelta(minutes=rng.randint(-7 * 24 * 60, 14 * 24 * 60)),
+            "priority": rng.choice(["high", "medium", "medium", "low"]),
+            "category": rng.choice(["task", "task", "assignment", "habit"]),
+            "completed": completed,
+            "completed_at": epoch + timedelta(seconds=i) if completed else None,
+            "created_at": epoch + timedelta(seconds=i),
+            "updated_at": epoch + timedelta(seconds=i),
+            "estimated_minutes": rng.choice([15, 30, 30, 45, 60, 90]),
+        }
+
+def reflection_rows(count: int, rng: random.Random, now: datetime, owners: list = None):
+    owners = owners or user_ids(1)
+    for i in range(count):
+        yield {
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "user_id": owners[i % len(owners)],
+            "date": now - timedelta(hours=i),
+            "transcribed_query": rng.choice(NOTES),
+            "used_in_suggestions": rng.random() < 0.8,
+        }
+
+def _insert_chunked(conn, table, rows):
+    from sqlalchemy import insert
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= CHUNK:
+            conn.execute(insert(table), batch)
+            batch = []
+    if batch:
+        conn.execute(insert(table), batch)
+
+def seed(engine, tasks: int = 0, reflections: int = 0, seed: int = 42, start: int = 0, users: int = 1):
+    """
+    Adds rows to an already-migrated database. Pass start= when topping up an
+    existing set so task titles and timestamps keep counting from where it left off.
+    """
+    from sqlalchemy import select
+    from engines.workload_rollups import rebuild_completion_rollups, rebuild_workload_rollups
+    import models
+
+    rng = random.Random(seed + start)
+    now = datetime.utcnow()
+    owners = user_ids(users)
+    with engine.begin() as conn:
+        existing = set(conn.scalars(select(models.User.id)))
+        missing = [{"id": u, "name": f"Bench {u[-6:]}", "phone_number": f"+1555{u[-6:]}"}
+                   for u in owners if u not in existing]
+        if missing:
+            _insert_chunked(conn, models.User.__table__, missing)
+        if tasks:
+            _insert_chunked(conn, models.Task.__table__, task_rows(tasks, rng, now, start, owners))
+        if reflections:
+            _insert_chunked(conn, models.UserReflection.__table__, reflection_rows(reflections, rng, now, owners))
+        if tasks:
+            rebuild_workload_rollups(conn)
+            rebuild_completion_rollups(conn)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--reflections", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, default=1)
+    args = parser.parse_args()
+
+    from database import engine  # noqa: E402
+    from migrate import migrate  # noqa: E402
+
+    migrate()
+    seed(engine, args.tasks, args.reflections, args.seed, users=args.users)
+    print(f"Seeded {args.tasks} tasks and {args.reflections} reflections for {args.users} user(s) into {engine.url}")
@@ -0,0 +1,80 @@
+"""
+Concurrent load test for the planner and voice webhooks.
+
+Run the API first (uvicorn main:app), then:
+    python benchmarks/load_test.py --seed 20000 --requests 400 --concurrency 50
+
+--seed writes synthetic tasks straight into DATABASE_URL before the run so the
+planner query has real work to do. Run it against two revisions to compare p99.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+ENDPOINTS = [
+    ("GET", "/api/planner/daily", None),
+    ("POST", "/api/voice/start", {"CallSid": "CA-load-test"}),
+    ("POST", "/api/voice/respond", {"SpeechResult": ""}),
+]
+
+def seed_tasks(count: int):
+    """Bulk-inserts synthetic tasks (see datagen.py) into DATABASE_URL."""
+    from database import engine
+    from migrate import migrate
+    import datagen
+
+    migrate()
+    datagen.seed(engine, tasks=count)
+    print(f"Seeded {count} tasks")
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def run(base_url: str, total: int, concurrency: int):
+    latencies = {path: [] for _, path, _ in ENDPOINTS}
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        async def one(i):
+            nonlocal errors
+            method, path, form = ENDPOINTS[i % len(ENDPOINTS)]
+            async with sem:
+                start = time.perf_counter()
+                try:
+                    resp = await client.request(method, path, data=form)
+                    if resp.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies[path].append((time.perf_counter() - start) * 1000)
+
+        wall = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        wall = time.perf_counter() - wall
+
+    print(f"{total} requests, concurrency {concurrency}, {wall:.2f}s wall, {errors} errors")
+    print(f"{'endpoint':<22}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for path, samples in latencies.items():
+        print(f"{path:<22}{statistics.median(samples):>10.1f}"
+              f"{percentile(samples, 95):>10.1f}{percentile(samples, 99):>10.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed_tasks(args.seed)
+    asyncio.run(run(args.url, args.requests, args.concurrency))
@@ -0,0 +1,62 @@
+"""
+Compares per-task priority scoring + full sort with the batch NumPy scorer + top-k.
+
+    python benchmarks/scoring_benchmark.py --sizes 10000 100000 --top 20
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from engines.scheduling_engine import calculate_priority_scores, top_k_indices  # noqa: E402
+from schemas import TaskResponse  # noqa: E402
+
+def make_tasks(n: int, now: datetime):
+    return [TaskResponse(
+        id=str(i),
+        title=f"Task {i}",
+        deadline=now + timedelta(hours=random.randint(1, 24 * 7)),
+        priority=random.choice(["high", "medium", "low"]),
+        created_at=now,
+    ) for i in range(n)]
+
+def per_task(tasks, now, top):
+    # The pre-batch engine: rebuild the weights and date math for every task
+    def score(task):
+        days_until = max(1, (task.deadline.date() - now.date()).days)
+        importance_map = {'high': 1.0, 'medium': 0.5, 'low': 0.2}
+        return (0.6 * (1.0 / days_until)) + (0.4 * importance_map.get(task.priority, 0.5))
+
+    scored = sorted(((score(t), t) for t in tasks), key=lambda x: x[0], reverse=True)
+    return scored[:top]
+
+def batched(tasks, now, top):
+    scores = calculate_priority_scores([t.deadline for t in tasks], [t.priority for t in tasks], now)
+    return [(scores[i], tasks[i]) for i in top_k_indices(scores, top)]
+
+def best_of(fn, repeats, *args):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    print(f"{'tasks':>10}{'per-task ms':>14}{'batch ms':>12}{'speedup':>10}")
+    for n in args.sizes:
+        tasks = make_tasks(n, now)
+        slow = best_of(per_task, args.repeats, tasks, now, args.top)
+        fast = best_of(batched, args.repeats, tasks, now, args.top)
+        print(f"{n:>10}{slow:>14.1f}{fast:>12.1f}{slow / fast:>9.1f}x")
@@ -0,0 +1,86 @@
+"""
+Task list serialization: ORM rows through Pydantic vs. column rows through orjson.
+
+    python benchmarks/serialization_benchmark.py --rows 10000 --repeat 20
+
+Seeds a scratch SQLite file and times both paths end to end from query to
+bytes. "pydantic" is what the endpoints used to do: load ORM objects, validate
+each into TaskResponse, then let FastAPI validate and encode the response_model.
+"lean" is the current path in engines/serialization.py. Both must produce the
+same JSON, which is checked before timing. Compressed sizes are listed last.
+"""
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+def best_of(repeat: int, fn) -> tuple:
+    samples, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), min(samples), result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'serialize.db')}"
+    sys.path.insert(0, os.path.dirname(__file__))
+
+    from typing import List  # noqa: E402
+    from fastapi.encoders import jsonable_encoder  # noqa: E402
+    from pydantic import TypeAdapter  # noqa: E402
+    from sqlalchemy import select  # noqa: E402
+    from database import SessionLocal, engine  # noqa: E402
+    from engines import serialization  # noqa: E402
+    from migrate import migrate  # noqa: E402
+    import datagen  # noqa: E402
+    import models, schemas  # noqa: E402
+
+    migrate()
+    response_adapter = TypeAdapter(List[schemas.TaskResponse])
+    seeded = 0
+
+    print(f"orjson: {'yes' if serialization.orjson else 'no (stdlib json)'}, "
+          f"brotli: {'yes' if serialization.brotli else 'no'}")
+    print(f"{'rows':>8}{'path':>10}{'median ms':>12}{'best ms':>10}{'speedup':>9}")
+    for rows in sorted(args.rows):
+        datagen.seed(engine, tasks=rows - seeded, start=seeded)
+        seeded = rows
+        query = models.Task.user_id == models.DEFAULT_USER_ID
+
+        def pydantic_path():
+            with SessionLocal() as db:
+                tasks = db.scalars(select(models.Task).where(query).limit(rows)).all()
+                validated = [schemas.TaskResponse.model_validate(t) for t in tasks]
+                # FastAPI 0.104: re-validate against response_model, jsonable_encoder, json.dumps
+                checked = response_adapter.validate_python(validated, from_attributes=True)
+                return json.dumps(jsonable_encoder(checked), separators=(",", ":")).encode()
+
+        def lean_path():
+            with SessionLocal() as db:
+                result = db.execute(select(*serialization.TASK_COLUMNS).where(query).limit(rows)).all()
+                return serialization.dumps([serialization.task_dict(row) for row in result])
+
+        old_median, old_best, old_body = best_of(args.repeat, pydantic_path)
+        new_median, new_best, new_body = best_of(args.repeat, lean_path)
+        if json.loads(old_body) != json.loads(new_body):
+            sys.exit(f"JSON differs at {rows} rows")
+
+        print(f"{rows:>8}{'pydantic':>10}{old_median:>12.1f}{old_best:>10.1f}{'':>9}")
+        print(f"{rows:>8}{'lean':>10}{new_median:>12.1f}{new_best:>10.1f}{old_median / new_median:>8.1f}x")
+
+        sizes = [f"raw {len(new_body) / 1024:.0f} KiB", f"gzip {len(gzip.compress(new_body, 5)) / 1024:.0f} KiB"]
+        if serialization.brotli:
+            sizes.append(f"br {len(serialization.brotli.compress(new_body, quality=4)) / 1024:.0f} KiB")
+        print(f"{'':>8}{'':>10}  {', '.join(sizes)}")
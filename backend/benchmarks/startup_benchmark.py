@@ -0,0 +1,50 @@
+"""
+Times a cold start: `import main`, then the first response through the ASGI app.
+
+    python benchmarks/startup_benchmark.py --runs 5
+
+Each run is a fresh interpreter against a scratch SQLite file that has already
+been migrated, with no OpenAI or Twilio credentials, so it measures what a
+worker (or a test session) pays before it can serve a request.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CHILD = """
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    client.get("/")
+    first = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "first_response_ms": (first - started) * 1000}))
+"""
+
+def run_once(env: dict) -> dict:
+    out = subprocess.run([sys.executable, "-c", CHILD], cwd=BACKEND, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    env = {k: v for k, v in os.environ.items() if not k.startswith(("OPENAI_", "TWILIO_"))}
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'startup.db')}"
+    env["AUTO_MIGRATE"] = "0"
+    subprocess.run([sys.executable, "migrate.py"], cwd=BACKEND, env=env, check=True, capture_output=True)
+
+    samples = [run_once(env) for _ in range(args.runs)]
+    for key in ("import_ms", "first_response_ms"):
+        values = [s[key] for s in samples]
+        print(f"{key:>18}: median {statistics.median(values):8.1f}  min {min(values):8.1f}  max {max(values):8.1f}")
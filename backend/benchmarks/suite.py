@@ -0,0 +1,237 @@
+"""
+Offline benchmark suite: every hot path, fake OpenAI and Twilio, JSON results.
+
+    python benchmarks/suite.py --sizes 1000 100000 --iterations 50
+    python benchmarks/suite.py --sizes 1000 100000 --baseline benchmarks/baseline.json
+    python benchmarks/suite.py --sizes 1000 100000 --baseline benchmarks/baseline.json --update-baseline
+
+Runs the app in-process over ASGI against a scratch SQLite file, topping the
+data up to each size in turn. The fakes answer with seeded latency and errors,
+so a run needs no network or credentials and repeats closely. With --baseline,
+any scenario whose p95 grew by more than --threshold is flagged and the exit
+code is 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+CAPTURE_TEXTS = [
+    "Submit physics assignment tomorrow at 5pm",  # fast path
+    "gym every morning at 7",
+    "call mom on friday",
+    "that thing Priya mentioned about the venue, sometime soonish",  # LLM path
+    "figure out whatever the landlord wanted",
+]
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def summarize(samples: list, errors: int, wall: float) -> dict:
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "ops_per_s": round(len(samples) / wall, 1) if wall else None,
+        "errors": errors,
+    }
+
+async def timed(iterations: int, fn) -> dict:
+    """Runs fn(i) sequentially; an exception or HTTP error counts against the scenario."""
+    samples, errors = [], 0
+    wall = time.perf_counter()
+    for i in range(iterations):
+        started = time.perf_counter()
+        try:
+            ok = await fn(i)
+        except Exception:
+            ok = False
+        samples.append((time.perf_counter() - started) * 1000)
+        errors += ok is False
+    return summarize(samples, errors, time.perf_counter() - wall)
+
+def scenarios(client, app_modules):
+    """Scenario name -> coroutine function of the iteration number."""
+    capture_engine, planner_cache, notifier, reminders, SessionLocal, models = app_modules
+
+    async def task_list(i):
+        page = await client.get("/api/tasks/", params={"limit": 100})
+        cursor = page.headers.get("x-next-cursor")
+        if cursor:
+            page = await client.get("/api/tasks/", params={"limit": 100, "cursor": cursor})
+        return page.status_code == 200
+
+    async def task_sync(i):
+        since = (datetime.utcnow() - timedelta(hours=1)).isoformat()
+        return (await client.get("/api/tasks/sync", params={"updated_since": since})).status_code == 200
+
+    async def daily_planner(i):
+        planner_cache.clear()  # Measure a build, not a cache hit
+        return (await client.get("/api/planner/daily", params={"limit": 20})).status_code == 200
+
+    async def daily_planner_cached(i):
+        return (await client.get("/api/planner/daily", params={"limit": 20})).status_code == 200
+
+    async def capture(i):
+        capture_engine._cache.clear()
+        resp = await client.post("/api/capture/", json={"text": CAPTURE_TEXTS[i % len(CAPTURE_TEXTS)]})
+        return resp.status_code == 200
+
+    async def voice_start(i):
+        return (await client.post("/api/voice/start", data={"CallSid": f"CA-bench-{i}"})).status_code == 200
+
+    async def voice_respond(i):
+        resp = await client.post("/api/voice/respond", data={"SpeechResult": "Keep tomorrow light please"})
+        return resp.status_code == 200
+
+    def _clear_outbox():
+        with SessionLocal() as db:
+            db.query(models.NotificationOutbox).delete()
+            db.commit()
+
+    async def pending_reminder(i):
+        _clear_outbox()  # Otherwise the idempotency key makes every run after the first a no-op
+        reminders.send_pending_task_reminder()
+        return notifier.drain_outbox()["sent"] == 1
+
+    async def evening_call(i):
+        reminders.trigger_evening_call(key=f"bench-call:{time.time_ns()}")
+        return True
+
+    return {
+        "task_list": task_list,
+        "task_sync": task_sync,
+        "daily_planner": daily_planner,
+        "daily_planner_cached": daily_planner_cached,
+        "capture": capture,
+        "voice_start": voice_start,
+        "voice_respond": voice_respond,
+        "pending_reminder": pending_reminder,
+        "evening_call": evening_call,
+    }
+
+async def run(args) -> dict:
+    import httpx
+    from clients import set_openai, set_twilio
+    from database import SessionLocal, engine
+    from engines import capture_engine, notifier, reminders
+    from engines.fake_openai import FakeAsyncOpenAI
+    from engines.fake_twilio import FakeTwilioClient
+    from engines.planner_cache import planner_cache
+    from migrate import migrate
+    import datagen
+    import main
+    import models
+
+    migrate()
+    set_openai(FakeAsyncOpenAI(args.openai_latency_ms, args.openai_jitter_ms, args.openai_failure_rate, seed=1))
+    set_twilio(FakeTwilioClient(args.twilio_latency_ms, args.twilio_failure_rate, seed=2))
+    # Measure the app, not Twilio's account rate limit
+    notifier._bucket = notifier.TokenBucket(1_000_000, 1_000)
+
+    modules = (capture_engine, planner_cache, notifier, reminders, SessionLocal, models)
+    results, seeded = {}, 0
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        for size in sorted(args.sizes):
+            started = time.perf_counter()
+            datagen.seed(engine, tasks=size - seeded, reflections=max(1, (size - seeded) // 1000), start=seeded)
+            seeded = size
+            print(f"\n{size:,} tasks (seeded in {time.perf_counter() - started:.1f}s)")
+            print(f"{'scenario':<22}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}{'errors':>8}")
+
+            results[str(size)] = {}
+            for name, fn in scenarios(client, modules).items():
+                if args.only and name not in args.only:
+                    continue
+                try:
+                    await fn(-1)  # Warm-up: imports, first connection, statement cache
+                except Exception:
+                    pass
+                stats = await timed(args.iterations, fn)
+                results[str(size)][name] = stats
+                print(f"{name:<22}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+                      f"{stats['ops_per_s']:>10.1f}{stats['errors']:>8}")
+    return results
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Scenarios whose p95 regressed by more than threshold (a fraction) against the baseline."""
+    regressions = []
+    for size, runs in results.items():
+        for name, stats in runs.items():
+            before = baseline.get("results", {}).get(size, {}).get(name)
+            if not before or not before.get("p95_ms"):
+                continue
+            change = stats["p95_ms"] / before["p95_ms"] - 1
+            if change > threshold:
+                regressions.append({"size": size, "scenario": name, "baseline_p95_ms": before["p95_ms"],
+                                    "p95_ms": stats["p95_ms"], "change": round(change, 3)})
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--only", nargs="*", help="run just these scenarios")
+    parser.add_argument("--openai-latency-ms", type=float, default=400)
+    parser.add_argument("--openai-jitter-ms", type=float, default=200)
+    parser.add_argument("--openai-failure-rate", type=float, default=0.02)
+    parser.add_argument("--twilio-latency-ms", type=float, default=150)
+    parser.add_argument("--twilio-failure-rate", type=float, default=0.0)
+    parser.add_argument("--out", default=os.path.join(os.path.dirname(__file__), "results", "latest.json"))
+    parser.add_argument("--baseline", help="JSON file from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed p95 growth, 0.2 = 20%%")
+    parser.add_argument("--update-baseline", action="store_true", help="write this run to --baseline")
+    args = parser.parse_args()
+
+    # The app reads these at import: a scratch database and placeholder phone numbers
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'suite.db')}"
+    os.environ.setdefault("MY_PHONE_NUMBER", "+15550000000")
+    os.environ.setdefault("NGROK_URL", "http://bench.invalid")
+    sys.path.insert(0, os.path.dirname(__file__))
+
+    results = asyncio.run(run(args))
+    report = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "iterations": args.iterations,
+            "fakes": {
+                "openai": {"latency_ms": args.openai_latency_ms, "jitter_ms": args.openai_jitter_ms,
+                           "failure_rate": args.openai_failure_rate},
+                "twilio": {"latency_ms": args.twilio_latency_ms, "failure_rate": args.twilio_failure_rate},
+            },
+        },
+        "results": results,
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.out}")
+
+    exit_code = 0
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for r in regressions:
+            print(f"⚠️ REGRESSION {r['scenario']} @ {r['size']}: p95 {r['baseline_p95_ms']} -> "
+                  f"{r['p95_ms']} ms (+{r['change']:.0%})")
+        if not regressions:
+            print(f"No p95 regressions beyond {args.threshold:.0%}")
+        exit_code = 1 if regressions else 0
+    sys.exit(exit_code)
@@ -0,0 +1,117 @@
+"""
+Measures NDJSON export and import throughput and the server's peak RSS.
+
+    python benchmarks/transfer_benchmark.py --rows 1000000
+
+Starts uvicorn on a scratch SQLite file seeded with --rows tasks, streams
+GET /api/tasks/export to disk, then starts a second server on an empty file
+and streams the export back through POST /api/tasks/import. Peak RSS is the
+server process's VmHWM (Linux only), so flat memory shows up as a flat number.
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+def seed(database_url: str, count: int):
+    subprocess.run([sys.executable, "migrate.py"], cwd=BACKEND, check=True, capture_output=True,
+                   env={**os.environ, "DATABASE_URL": database_url})
+    from sqlalchemy import create_engine, insert
+    sys.path.insert(0, BACKEND)
+    import models
+
+    engine = create_engine(database_url)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for start in range(0, count, 50_000):
+            conn.execute(insert(models.Task), [{
+                "id": str(uuid.uuid4()),
+                "title": f"Transfer task {i}",
+                "deadline": now + timedelta(hours=random.randint(1, 24 * 60)),
+                "priority": random.choice(["high", "medium", "low"]),
+                "category": "task",
+                "completed": random.random() < 0.3,
+                "created_at": now,
+                "updated_at": now,
+                "estimated_minutes": 30,
+            } for i in range(start, min(count, start + 50_000))])
+    engine.dispose()
+
+def start_server(database_url: str, port: int) -> subprocess.Popen:
+    env = {**os.environ, "DATABASE_URL": database_url, "AUTO_MIGRATE": "1"}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=env,
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return proc
+        except httpx.TransportError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+def report(label: str, rows: int, seconds: float, proc: subprocess.Popen):
+    print(f"{label:>8}: {rows:>9} rows in {seconds:7.1f}s = {rows / seconds:>9.0f} rows/s, "
+          f"server peak RSS {peak_rss_mb(proc.pid):7.1f} MiB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp()
+    source_url = f"sqlite:///{os.path.join(scratch, 'source.db')}"
+    target_url = f"sqlite:///{os.path.join(scratch, 'target.db')}"
+    dump = os.path.join(scratch, "export.ndjson")
+
+    print(f"Seeding {args.rows} tasks...")
+    seed(source_url, args.rows)
+
+    server = start_server(source_url, args.port)
+    try:
+        started = time.perf_counter()
+        lines = 0
+        with httpx.stream("GET", f"http://127.0.0.1:{args.port}/api/tasks/export", timeout=None) as response, \
+                open(dump, "wb") as out:
+            for chunk in response.iter_bytes():
+                lines += chunk.count(b"\n")
+                out.write(chunk)
+        report("export", lines, time.perf_counter() - started, server)
+    finally:
+        server.terminate()
+        server.wait()
+
+    server = start_server(target_url, args.port)
+    try:
+        def body():
+            with open(dump, "rb") as f:
+                while chunk := f.read(1 << 20):
+                    yield chunk
+
+        started = time.perf_counter()
+        result = httpx.post(f"http://127.0.0.1:{args.port}/api/tasks/import", content=body(), timeout=None).json()
+        report("import", result["tasks"]["inserted"], time.perf_counter() - started, server)
+        if result["invalid"]:
+            print(f"  {result['invalid']} invalid lines, first: {result['errors'][:3]}")
+    finally:
+        server.terminate()
+        server.wait()
@@ -0,0 +1,131 @@
+"""
+Twilio webhook latency: time until the TwiML is sent, per script source.
+
+    python benchmarks/voice_benchmark.py --users 200 --tasks 50000 --requests 2000 --concurrency 50
+
+Seeds a scratch SQLite file, lets the evening-call job place one call per user
+through the fake Twilio client, then answers those calls the way Twilio would.
+Each request is driven straight through the ASGI app and timed to its last
+body message, so work deferred until after the response (the reflection
+commit) doesn't count, just as Twilio doesn't wait for it.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def post_form(app, url: str, form: dict) -> tuple:
+    """POSTs a form through the ASGI app. Returns (status, ms until the response body went out)."""
+    parts = urlsplit(url)
+    body = urlencode(form).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": parts.path, "raw_path": parts.path.encode(),
+        "query_string": parts.query.encode(), "root_path": "",
+        "headers": [(b"host", b"bench"), (b"content-type", b"application/x-www-form-urlencoded"),
+                    (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    answered = asyncio.Event()
+    result = {"status": None, "ms": None}
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await answered.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body"):
+            result["ms"] = (time.perf_counter() - started) * 1000
+            answered.set()
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    return result["status"], result["ms"]
+
+async def measure(app, requests: list, concurrency: int) -> tuple:
+    sem = asyncio.Semaphore(concurrency)
+    samples, errors = [], 0
+
+    async def one(url, form):
+        nonlocal errors
+        async with sem:
+            status, ms = await post_form(app, url, form)
+            errors += status != 200
+            samples.append(ms)
+
+    await asyncio.gather(*(one(url, form) for url, form in requests))
+    return samples, errors
+
+async def run(args):
+    from clients import set_twilio
+    from database import engine
+    from engines import notifier, reminders
+    from engines.call_scripts import call_scripts
+    from engines.fake_twilio import FakeTwilioClient
+    from migrate import migrate
+    import datagen
+    import main
+
+    migrate()
+    datagen.seed(engine, tasks=args.tasks, users=args.users)
+    twilio = FakeTwilioClient(latency_ms=0, seed=1)
+    set_twilio(twilio)
+    notifier._bucket = notifier.TokenBucket(1_000_000, 1_000)
+
+    reminders.trigger_evening_call(key="voice-bench")
+    calls = [(c["sid"], c["url"]) for c in twilio.sent if "/api/voice/start" in c.get("url", "")]
+    print(f"{len(calls)} calls placed for {args.users} users, {args.tasks:,} tasks")
+
+    placed = [calls[i % len(calls)] for i in range(args.requests)]
+    scenarios = {
+        "start: cached by SID": [(url, {"CallSid": sid}) for sid, url in placed],
+        "start: outbox row": [(url, {"CallSid": f"CA-elsewhere-{i}"}) for i, (_, url) in enumerate(placed)],
+        "start: fallback": [("http://bench/api/voice/start", {"CallSid": f"CA-inbound-{i}"})
+                            for i in range(args.requests)],
+        "respond: note": [(f"http://bench/api/voice/respond?user={parse_qs(urlsplit(url).query)['user'][0]}",
+                           {"SpeechResult": "Keep tomorrow light please"}) for _, url in placed],
+        "respond: silence": [("http://bench/api/voice/respond", {"SpeechResult": ""})] * args.requests,
+    }
+
+    print(f"{'webhook':<24}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, requests in scenarios.items():
+        if name == "start: outbox row":
+            call_scripts._entries.clear()  # As if another worker had placed the calls
+        await post_form(main.app, *requests[0])  # Warm-up
+        samples, errors = await measure(main.app, requests, args.concurrency)
+        print(f"{name:<24}{statistics.median(samples):>10.2f}{percentile(samples, 95):>10.2f}"
+              f"{percentile(samples, 99):>10.2f}{errors:>8}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=20_000)
+    parser.add_argument("--requests", type=int, default=1_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    # The app reads these at import: a scratch database and a public URL for the webhooks
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'voice.db')}"
+    os.environ.setdefault("MY_PHONE_NUMBER", "+15550000000")
+    os.environ.setdefault("NGROK_URL", "http://bench")
+    os.environ["AUTO_MIGRATE"] = "0"
+    sys.path.insert(0, os.path.dirname(__file__))
+
+    asyncio.run(run(args))
@@ -0,0 +1,71 @@
+"""
+Shared provider clients, built on first use.
+
+Nothing here touches the network or needs credentials at import time, so
+importing the app (or a test module) stays cheap. Every OpenAI caller shares
+one AsyncOpenAI instance and therefore one pooled HTTP/2 connection set. Settings
+are read when a client is built, after database.py has loaded .env.
+"""
+import os
+import threading
+
+_lock = threading.Lock()
+_openai = None
+_twilio = None
+
+def get_openai():
+    """The process-wide AsyncOpenAI client. OPENAI_FAKE=1 swaps in the offline fake."""
+    global _openai
+    if _openai is None:
+        with _lock:
+            if _openai is None and os.getenv("OPENAI_FAKE") == "1":
+                from engines.fake_openai import FakeAsyncOpenAI
+                _openai = FakeAsyncOpenAI(latency_ms=float(os.getenv("OPENAI_FAKE_LATENCY_MS", "0")))
+            if _openai is None:
+                import httpx
+                from openai import AsyncOpenAI
+
+                http_client = httpx.AsyncClient(
+                    http2=True,
+                    limits=httpx.Limits(
+                        max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "20")),
+                        max_keepalive_connections=int(os.getenv("OPENAI_KEEPALIVE_CONNECTIONS", "10")),
+                    ),
+                    timeout=float(os.getenv("OPENAI_TIMEOUT", "30")),
+                )
+                _openai = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client)
+    return _openai
+
+def get_twilio():
+    """
+    The process-wide Twilio client. TWILIO_FAKE=1 swaps in the offline fake so
+    the outbox can run (and be benchmarked) without credentials.
+    """
+    global _twilio
+    if _twilio is None:
+        with _lock:
+            if _twilio is None:
+                if os.getenv("TWILIO_FAKE") == "1":
+                    from engines.fake_twilio import FakeTwilioClient
+                    _twilio = FakeTwilioClient(latency_ms=float(os.getenv("TWILIO_FAKE_LATENCY_MS", "0")))
+                else:
+                    from twilio.rest import Client
+                    _twilio = Client(os.getenv("TWILIO_ACCOUNT_SID"), os.getenv("TWILIO_AUTH_TOKEN"))
+    return _twilio
+
+def set_openai(client):
+    """Points every OpenAI caller at another client (a stub, in benchmarks)."""
+    global _openai
+    _openai = client
+
+def set_twilio(client):
+    """Points the dispatcher at another client (the fake one, in benchmarks)."""
+    global _twilio
+    _twilio = client
+
+async def close_clients():
+    """Releases pooled connections on shutdown."""
+    global _openai
+    if _openai is not None and hasattr(_openai, "close"):
+        await _openai.close()
+    _openai = None
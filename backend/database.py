@@ -1,5 +1,9 @@
 import os
-from sqlalchemy import create_engine
+from collections import OrderedDict
+from typing import Optional
+from fastapi import Header, HTTPException
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 from dotenv import load_dotenv
 
@@ -8,19 +12,155 @@ load_dotenv()
 # Force SQLite for the hackathon
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./focusflow.db")
 
+def _async_url(url: str) -> str:
+    """Maps the sync URL onto its asyncio driver (aiosqlite / asyncpg)."""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+asyncpg://", 1)
+    return url
+
+ASYNC_DATABASE_URL = _async_url(SQLALCHEMY_DATABASE_URL)
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+
+# Postgres pool sizing; every worker process gets its own pool of this size
+POOL_OPTIONS = {} if IS_SQLITE else {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    "pool_pre_ping": True,
+}
+
+# SQLite tuning applied to every new connection: WAL lets readers run alongside the writer
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",  # Durable across app crashes in WAL mode; only an OS crash can lose the last commit
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),  # Negative = KiB, so 64 MiB
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", "268435456"),  # 256 MiB
+    "temp_store": "MEMORY",
+    "busy_timeout": "5000",
+}
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {pragma}={value}")
+    cursor.close()
+
 # Crucial optimization for FastAPI + SQLite
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False} 
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},
+    **POOL_OPTIONS
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Routers use the async engine so a slow query never blocks the event loop.
+# The sync engine above stays for APScheduler jobs and schema setup.
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **POOL_OPTIONS)
+
+if IS_SQLITE:
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+# One-off data fixes to run right after a column is added to an existing table
+COLUMN_BACKFILLS = {
+    ("tasks", "updated_at"): "UPDATE tasks SET updated_at = created_at WHERE updated_at IS NULL",
+    # The last write is the best guess at when an already-finished task was finished
+    ("tasks", "completed_at"): "UPDATE tasks SET completed_at = updated_at WHERE completed = true AND completed_at IS NULL",
+    ("users", "cache_version"): "UPDATE users SET cache_version = 0 WHERE cache_version IS NULL",
+    # Rows from before accounts existed belong to models.DEFAULT_USER_ID
+    **{(table, "user_id"): f"UPDATE {table} SET user_id = 'default' WHERE user_id IS NULL"
+       for table in ("tasks", "task_tombstones", "busy_blocks", "user_reflections")},
+}
+
+# Indexes superseded by per-user composites; dropped so writes stop paying for them
+DROPPED_INDEXES = (
+    "ix_tasks_created_at_id", "ix_tasks_open_deadline", "ix_tasks_updated_at",
+    "ix_task_tombstones_deleted_at", "ix_busy_blocks_start", "ix_user_reflections_unused_date",
+)
+
+# Tables that can be recomputed from others: dropped and recreated when their primary key changes
+DERIVED_TABLES = {"daily_workload"}
+
+def init_db() -> set:
+    """
+    Creates missing tables, then adds columns and indexes that older databases lack.
+    Returns the names of tables that were newly created so callers can backfill them.
+    """
+    import models  # noqa: F401 (registers every table on Base.metadata)
+
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    for name in DERIVED_TABLES & existing_tables:
+        table = Base.metadata.tables[name]
+        if inspector.get_pk_constraint(name)["constrained_columns"] != [c.name for c in table.primary_key]:
+            table.drop(bind=engine)
+            existing_tables.discard(name)
+
+    Base.metadata.create_all(bind=engine)
+    inspector = inspect(engine)
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"))
+                backfill = COLUMN_BACKFILLS.get((table.name, column.name))
+                if backfill:
+                    conn.execute(text(backfill))
+
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+        for name in DROPPED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    return set(Base.metadata.tables) - existing_tables
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# IDs already confirmed to exist, most recently seen last. Users are never deleted,
+# so dropping the oldest only costs them one more lookup
+KNOWN_USERS_CACHE = int(os.getenv("KNOWN_USERS_CACHE", "10000"))
+_known_user_ids: "OrderedDict[str, None]" = OrderedDict()
+
+async def get_current_user_id(x_user_id: Optional[str] = Header(None)) -> str:
+    """
+    Whose data a request touches, from the X-User-Id header. Requests without it
+    act as the default user, which is how the single-user app keeps working.
+    """
+    import models
+
+    user_id = x_user_id or models.DEFAULT_USER_ID
+    if user_id in _known_user_ids:
+        _known_user_ids.move_to_end(user_id)
+        return user_id
+    # Own short session: the route's may live as long as a streaming response
+    async with AsyncSessionLocal() as db:
+        exists = await db.get(models.User, user_id) is not None
+    if not exists:
+        raise HTTPException(status_code=401, detail=f"Unknown user {user_id}")
+    _known_user_ids[user_id] = None
+    while len(_known_user_ids) > KNOWN_USERS_CACHE:
+        _known_user_ids.popitem(last=False)
+    return user_id
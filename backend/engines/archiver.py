@@ -0,0 +1,65 @@
+"""
+1️⃣ Problem: Completed tasks stayed in `tasks` forever, so the live table and its
+indexes kept growing even though every hot query filters them straight back out.
+
+4️⃣ Core Logic: a nightly job moves tasks finished before the cutoff into archived_tasks
+in fixed-size batches: copy, tombstone, delete, one transaction per batch. The
+completion rollups counted each task when it was finished, so Insights doesn't notice
+the move; delta-sync clients get tombstones and drop the rows locally.
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import DateTime, and_, delete, insert, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database import SessionLocal
+import models
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_BATCH = int(os.getenv("ARCHIVE_BATCH", "1000"))
+
+# Every archived column except archived_at comes straight from tasks
+ARCHIVED_COLUMNS = [c.name for c in models.ArchivedTask.__table__.columns if c.name != "archived_at"]
+
+def archive_completed_tasks(older_than_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH,
+                            max_batches: Optional[int] = None) -> int:
+    """Moves completed tasks finished more than older_than_days ago. Returns how many moved."""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    tasks = models.Task.__table__
+    moved, batches = 0, 0
+    with SessionLocal() as db:
+        insert_fn = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+        while max_batches is None or batches < max_batches:
+            # Oldest first, straight off the partial index on finished tasks. Ended habit
+            # series stay put: they were never counted as completions, so they can't be archived as one
+            ids = db.scalars(select(tasks.c.id).where(
+                tasks.c.completed == True,
+                tasks.c.completed_at < cutoff,
+                tasks.c.recurrence.is_(None)
+            ).order_by(tasks.c.completed_at).limit(batch_size)).all()
+            if not ids:
+                break
+
+            # Re-check the filter: a task may have been reopened since the SELECT
+            batch = and_(tasks.c.id.in_(ids), tasks.c.completed == True, tasks.c.completed_at < cutoff)
+            now = literal(datetime.utcnow(), DateTime)
+            db.execute(insert(models.ArchivedTask).from_select(
+                ARCHIVED_COLUMNS + ["archived_at"],
+                select(*(tasks.c[name] for name in ARCHIVED_COLUMNS), now).where(batch),
+            ))
+            # An ID deleted once and later re-imported already has a tombstone; move it forward
+            tombstones = insert_fn(models.TaskTombstone).from_select(
+                ["id", "user_id", "deleted_at"],
+                select(tasks.c.id, tasks.c.user_id, now).where(batch),
+            )
+            db.execute(tombstones.on_conflict_do_update(
+                index_elements=["id"], set_={"deleted_at": tombstones.excluded.deleted_at},
+            ))
+            moved += db.execute(delete(tasks).where(batch)).rowcount
+            db.commit()
+            batches += 1
+
+    if moved:
+        print(f"🗄️ Archived {moved} completed task(s) finished before {cutoff:%Y-%m-%d}")
+    return moved
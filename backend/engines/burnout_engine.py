@@ -1,39 +1,28 @@
-import os
 import json
 import uuid
-from typing import List, Tuple
+from typing import List, Sequence, Tuple
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from openai import AsyncOpenAI
-from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from clients import get_openai
+from engines.metrics import span
 import models
-from schemas import TaskResponse
+from engines.workload_rollups import workload_between
 
-# Load environment variables for OpenAI
-load_dotenv()
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-async def analyze_workload(tasks: List[TaskResponse], db: Session) -> Tuple[int, bool, List[dict]]:
+async def analyze_workload(tasks: Sequence, db: AsyncSession, user_id: str, current_time: datetime = None) -> Tuple[int, bool, List[dict]]:
     """
     1️⃣ Problem: Users burn out. Voice requests from the previous night need to be actioned.
     4️⃣ Core Logic: Weighted workload summation + OpenAI generation based on Voice Reflection.
+    The weighted score comes from the per-day rollups (at most 8 rows), not from a pass over the tasks.
+    tasks only needs id, title, priority and completed, so planner rows are passed as-is.
     """
-    score = 0
-    high_tasks = []
-    low_tasks = []
-    
-    # 1. Calculate base workload
-    for t in tasks:
-        if not t.completed:
-            if t.priority == 'high':
-                score += 15
-                high_tasks.append(t)
-            elif t.priority == 'medium':
-                score += 10
-            elif t.priority == 'low':
-                score += 5
-                low_tasks.append(t)
+    if not current_time:
+        current_time = datetime.utcnow()
+
+    # 1. Calculate base workload for the coming week from the rollups
+    rollups = await workload_between(db, user_id, current_time.date(), (current_time + timedelta(days=7)).date())
+    score = sum(day.weighted_score for day in rollups)
                 
     # 50 is the cognitive threshold limit
     burnout_warning = score > 50
@@ -41,6 +30,11 @@ async def analyze_workload(tasks: List[TaskResponse], db: Session) -> Tuple[int,
     
     # 2. Add rule-based burnout suggestions if overwhelmed
     if burnout_warning:
+        # Tasks arrive ranked, so the first matches are the ones to act on
+        open_tasks = [t for t in tasks if not t.completed]
+        high_tasks = [t for t in open_tasks if t.priority == 'high']
+        low_tasks = [t for t in open_tasks if t.priority == 'low']
+
         if low_tasks:
             target = low_tasks[0]
             suggestions.append({
@@ -63,9 +57,10 @@ async def analyze_workload(tasks: List[TaskResponse], db: Session) -> Tuple[int,
             })
 
     # 3. Read Voice Query from Last Night & Generate AI Suggestion
-    latest_reflection = db.query(models.UserReflection).filter(
+    latest_reflection = await db.scalar(select(models.UserReflection).where(
+        models.UserReflection.user_id == user_id,
         models.UserReflection.used_in_suggestions == False
-    ).order_by(models.UserReflection.date.desc()).first()
+    ).order_by(models.UserReflection.date.desc()).limit(1))
 
     if latest_reflection:
         voice_context = latest_reflection.transcribed_query
@@ -82,12 +77,13 @@ async def analyze_workload(tasks: List[TaskResponse], db: Session) -> Tuple[int,
         """
         
         try:
-            response = await client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "system", "content": system_prompt}],
-                response_format={ "type": "json_object" },
-                temperature=0.3
-            )
+            with span("llm_call", caller="burnout"):
+                response = await get_openai().chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[{"role": "system", "content": system_prompt}],
+                    response_format={ "type": "json_object" },
+                    temperature=0.3
+                )
             
             ai_data = json.loads(response.choices[0].message.content)
             
@@ -102,7 +98,7 @@ async def analyze_workload(tasks: List[TaskResponse], db: Session) -> Tuple[int,
             
             # Mark the reflection as used so it doesn't show up again tomorrow
             latest_reflection.used_in_suggestions = True
-            db.commit()
+            await db.commit()
             
         except Exception as e:
             print(f"⚠️ Failed to generate voice suggestion: {e}")
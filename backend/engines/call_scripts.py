@@ -0,0 +1,90 @@
+"""
+1️⃣ Problem: Twilio fetches /api/voice/start while the phone is already ringing,
+and the webhook used to query tasks and build the script right then. Twilio
+gives up on slow webhooks, so this is the most latency-sensitive path we have.
+
+4️⃣ Core Logic: the evening-call job renders each user's TwiML when it queues the
+call and stores it on the outbox row. When the call goes out, the notifier files
+the script under its call SID in an in-process cache. The webhook answers from
+that cache, then from the outbox row by primary key (another worker placed the
+call), and only then from a generic script that needs no database at all.
+Every reply that doesn't depend on the user is rendered once at import.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Sequence
+from xml.sax.saxutils import escape, quoteattr
+
+# The public URL Twilio calls back on
+BASE_URL = os.getenv("NGROK_URL")
+VOICE = 'voice="Polly.Aditi" language="en-IN"'
+LISTED_TASKS = 3
+
+def _twiml(content: str) -> str:
+    return f'<?xml version="1.0" encoding="UTF-8"?><Response>{content}</Response>'
+
+def _gather(user_id: Optional[str], script: str) -> str:
+    action = f"{BASE_URL}/api/voice/respond" + (f"?user={user_id}" if user_id else "")
+    # Quick Gather (Trial friendly: short timeout)
+    return _twiml(
+        f'<Gather input="speech" action={quoteattr(action)} method="POST" speechTimeout="3" language="en-IN">'
+        f"<Say {VOICE}>{escape(script)}</Say>"
+        f"</Gather>"
+        f"<Say {VOICE}>I didn't hear anything. Keeping your schedule as is. Goodnight!</Say>"
+        f"<Hangup/>"
+    )
+
+def render_start(user_id: Optional[str], titles: Sequence[str]) -> str:
+    """The opening prompt for a reminder call: up to three pending tasks, then one spoken update."""
+    if not titles:
+        script = "Namaste! This is Focus Flow. You have no pending tasks today. Excellent job! Do you have any quick notes for tomorrow?"
+    else:
+        task_names = ", ".join(titles[:LISTED_TASKS])
+        script = f"Namaste! This is your reminder. You still have {task_names} pending. Please update them in the app. Anything to add for tomorrow's plan?"
+    return _gather(user_id, script)
+
+def fallback_start(user_id: Optional[str] = None) -> str:
+    """Generic opening that needs no task list, for calls with no prepared script."""
+    return _gather(user_id, "Namaste! This is Focus Flow with your evening check-in. Anything to add for tomorrow's plan?")
+
+def _render_reply(reply: str) -> str:
+    # End call immediately to avoid Trial timeouts
+    return _twiml(f"<Say {VOICE}>{reply}</Say><Hangup/>")
+
+NOTED_TWIML = _render_reply("Got it, I've noted that down. Your schedule will be updated. Goodnight!")
+NO_UPDATE_TWIML = _render_reply("No updates received. Goodnight!")
+
+class CallScriptCache:
+    """Rendered TwiML by call SID. Entries outlive any realistic ring time, then age out."""
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 900):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, call_sid: str, twiml: str):
+        with self._lock:
+            self._entries[call_sid] = (time.monotonic(), twiml)
+            self._entries.move_to_end(call_sid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, call_sid: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(call_sid)
+            if entry is None:
+                return None
+            stored_at, twiml = entry
+            # Kept after a hit: Twilio retries the webhook if the first answer is slow
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[call_sid]
+                return None
+            return twiml
+
+call_scripts = CallScriptCache(
+    max_entries=int(os.getenv("CALL_SCRIPT_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("CALL_SCRIPT_TTL", "900")),
+)
@@ -1,60 +1,527 @@
 import os
+import re
 import json
+import time
+import asyncio
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from openai import AsyncOpenAI
-from dotenv import load_dotenv
+from typing import List, Optional, Sequence, Tuple
 
-load_dotenv()
+from clients import get_openai
+from engines.metrics import count, span
 
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Local parses at or above this confidence skip the LLM entirely
+FAST_PATH_THRESHOLD = float(os.getenv("CAPTURE_FAST_PATH_THRESHOLD", "0.75"))
+CACHE_SIZE = int(os.getenv("CAPTURE_CACHE_SIZE", "1024"))
+
+# Micro-batching and OpenAI protection knobs
+BATCH_WINDOW_MS = float(os.getenv("CAPTURE_BATCH_WINDOW_MS", "20"))
+BATCH_MAX_SIZE = int(os.getenv("CAPTURE_BATCH_MAX_SIZE", "20"))
+LLM_MAX_CONCURRENCY = int(os.getenv("CAPTURE_LLM_CONCURRENCY", "4"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("CAPTURE_LLM_TIMEOUT", "8"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("CAPTURE_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("CAPTURE_BREAKER_COOLDOWN", "30"))
+
+_stats = {
+    "requests": 0, "fast_path": 0, "cache_hits": 0, "breaker_skips": 0,
+    "llm_calls": 0, "llm_failures": 0, "llm_items": 0, "llm_seconds": 0.0,
+}
+_cache: "OrderedDict[tuple, dict]" = OrderedDict()
+
+FIELDS_PROMPT = """
+    - "title": A clean, actionable title for the task (string).
+    - "category": Must be one of ["task", "assignment", "habit"].
+    - "priority": Must be one of ["high", "medium", "low"].
+    - "deadline": ISO 8601 datetime string. If no time is specified, default to 23:59:59 of the target date. If no date is implied, default to 3 days from current date.
+    """
+
+class CircuitBreaker:
+    """
+    Stops calling OpenAI after repeated failures so captures fall straight through
+    to the local parser. After the cooldown, calls are let through again and the
+    first success closes the breaker.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None and time.monotonic() - self.opened_at < self.cooldown_seconds
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                print(f"⚠️ OpenAI circuit opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+
+class MicroBatcher:
+    """
+    Gathers parse requests that arrive within a short window and sends them to
+    the LLM as one JSON-array completion, then fans the results back out.
+    """
+
+    def __init__(self, window_ms: float, max_size: int):
+        self.window = window_ms / 1000
+        self.max_size = max_size
+        self._pending: List[Tuple[str, datetime, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight = set()
+
+    async def submit(self, text: str, current_time: datetime) -> dict:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, current_time, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run(self, batch):
+        texts = [text for text, _, _ in batch]
+        try:
+            results = await _llm_parse(texts, batch[0][1])
+        except Exception as e:
+            print(f"⚠️ LLM parsing failed: {e}. Falling back to rule-based engine.")
+            results = [None] * len(batch)
+
+        for (text, current_time, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if result is None:
+                count("capture", path="fallback")
+                future.set_result(_fallback_parser(text, current_time))
+                continue
+            count("capture", path="llm")
+            _cache[(_normalize(text), current_time.date())] = dict(result)
+            if len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+            future.set_result(result)
+
+_breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN_SECONDS)
+_batcher = MicroBatcher(BATCH_WINDOW_MS, BATCH_MAX_SIZE)
+_llm_slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
 
 async def parse_smart_input(text: str, current_time: datetime) -> dict:
     """
-    Parses messy user inputs into structured task data using GPT-4o-mini.
+    Parses messy user inputs into structured task data.
+    Common phrasing is handled by the local parser in microseconds; GPT-4o-mini
+    is only asked when the local parse is unsure, and its answers are cached.
     """
-    system_prompt = f"""
+    _stats["requests"] += 1
+
+    # 1. Fast path: dates, times and keywords we can read ourselves
+    parsed, confidence = _local_parse(text, current_time)
+    if confidence >= FAST_PATH_THRESHOLD:
+        _stats["fast_path"] += 1
+        count("capture", path="fast_path")
+        return parsed
+
+    # 2. Same phrase already sent to the LLM today
+    cache_key = (_normalize(text), current_time.date())
+    cached = _cache.get(cache_key)
+    if cached is not None:
+        _cache.move_to_end(cache_key)
+        _stats["cache_hits"] += 1
+        count("capture", path="cache")
+        return dict(cached)
+
+    # 3. OpenAI is unhealthy: don't queue behind a dead endpoint
+    if _breaker.is_open:
+        _stats["breaker_skips"] += 1
+        count("capture", path="breaker_open")
+        return parsed
+
+    # 4. Coalesce with other in-flight captures into one completion
+    return await _batcher.submit(text, current_time)
+
+async def parse_many(texts: Sequence[str], current_time: datetime) -> List[dict]:
+    """Parses a pasted list; the items that need the LLM share a single batched call."""
+    return list(await asyncio.gather(*(parse_smart_input(t, current_time) for t in texts)))
+
+async def _llm_parse(texts: Sequence[str], current_time: datetime) -> List[Optional[dict]]:
+    """One completion for any number of inputs. Items the model garbles come back as None."""
+    if len(texts) == 1:
+        system_prompt = f"""
     You are an AI assistant for the FocusFlow productivity app.
     Extract task details from user input.
     Current date and time: {current_time.isoformat()}
     
-    Return ONLY a valid JSON object with these EXACT keys:
-    - "title": A clean, actionable title for the task (string).
-    - "category": Must be one of ["task", "assignment", "habit"].
-    - "priority": Must be one of ["high", "medium", "low"].
-    - "deadline": ISO 8601 datetime string. If no time is specified, default to 23:59:59 of the target date. If no date is implied, default to 3 days from current date.
-    """
+    Return ONLY a valid JSON object with these EXACT keys:{FIELDS_PROMPT}"""
+        user_content = texts[0]
+    else:
+        system_prompt = f"""
+    You are an AI assistant for the FocusFlow productivity app.
+    The user message is a JSON array of {len(texts)} separate task inputs.
+    Current date and time: {current_time.isoformat()}
+    
+    Return ONLY a valid JSON object of the form {{"tasks": [...]}} holding exactly one
+    object per input, in the same order, each with these EXACT keys:{FIELDS_PROMPT}"""
+        user_content = json.dumps(list(texts))
 
+    content = await _complete([
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_content}
+    ])
+    data = json.loads(content)
+    items = [data] if len(texts) == 1 else data.get("tasks", [])
+    if len(items) != len(texts):
+        raise ValueError(f"expected {len(texts)} parsed tasks, got {len(items)}")
+
+    _stats["llm_items"] += len(texts)
+    return [_from_llm(item) for item in items]
+
+async def _complete(messages: list) -> str:
+    """Bounded-concurrency, time-limited completion that feeds the circuit breaker."""
+    async with _llm_slots:
+        started = time.perf_counter()
+        _stats["llm_calls"] += 1
+        try:
+            with span("llm_call", caller="capture"):
+                response = await asyncio.wait_for(get_openai().chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=messages,
+                    response_format={ "type": "json_object" },
+                    temperature=0.1 # Low temperature for deterministic behavior
+                ), timeout=LLM_TIMEOUT_SECONDS)
+        except Exception:
+            _stats["llm_failures"] += 1
+            _breaker.record_failure()
+            raise
+        _breaker.record_success()
+        _stats["llm_seconds"] += time.perf_counter() - started
+        return response.choices[0].message.content
+
+def _from_llm(result) -> Optional[dict]:
+    if not isinstance(result, dict) or not result.get("title") or not result.get("deadline"):
+        return None
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": text}
-            ],
-            response_format={ "type": "json_object" },
-            temperature=0.1 # Low temperature for deterministic behavior
-        )
-        
-        result = json.loads(response.choices[0].message.content)
-        
         # Convert string ISO date back to Python datetime object for the DB
-        if "deadline" in result:
-            # Handle standard format and Z-suffix format
-            clean_date = result["deadline"].replace('Z', '+00:00')
-            result["deadline"] = datetime.fromisoformat(clean_date).replace(tzinfo=None)
-            
+        # Handle standard format and Z-suffix format
+        clean_date = result["deadline"].replace('Z', '+00:00')
+        result["deadline"] = datetime.fromisoformat(clean_date).replace(tzinfo=None)
         return result
+    except (TypeError, ValueError, AttributeError):
+        return None
 
-    except Exception as e:
-        print(f"⚠️ LLM parsing failed: {e}. Falling back to rule-based engine.")
-        return _fallback_parser(text, current_time)
+def capture_stats() -> dict:
+    """Fast-path hit rate and the LLM latency it saved, since process start."""
+    requests = _stats["requests"] or 1
+    llm_ok = _stats["llm_calls"] - _stats["llm_failures"]
+    avg_llm_ms = (_stats["llm_seconds"] / llm_ok * 1000) if llm_ok else 0.0
+    skipped = _stats["fast_path"] + _stats["cache_hits"]
+    return {
+        **{k: v for k, v in _stats.items() if k != "llm_seconds"},
+        "llm_successes": llm_ok,
+        "fast_path_hit_rate": round(_stats["fast_path"] / requests, 4),
+        "cache_hit_rate": round(_stats["cache_hits"] / requests, 4),
+        "avg_llm_latency_ms": round(avg_llm_ms, 1),
+        "estimated_latency_saved_ms": round(skipped * avg_llm_ms, 1),
+        "avg_items_per_llm_call": round(_stats["llm_items"] / llm_ok, 2) if llm_ok else 0.0,
+        "circuit_open": _breaker.is_open,
+        "cache_entries": len(_cache),
+    }
 
 def _fallback_parser(text: str, current_time: datetime) -> dict:
-    """Fallback if OpenAI is down/rate-limited to save the Hackathon demo."""
-    text_lower = text.lower()
+    """Fallback if OpenAI is down/rate-limited: take the local parse whatever its confidence."""
+    return _local_parse(text, current_time)[0]
+
+# --- LOCAL RULE-BASED PARSER ---
+
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+_NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+                 "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "couple of": 2, "few": 3}
+_PARTS_OF_DAY = {"morning": 9, "noon": 12, "afternoon": 15, "evening": 18, "tonight": 21, "night": 21, "midnight": 23}
+# Parts of the day that settle which half of the clock a bare "at 7" means
+_AM_PARTS = {"morning"}
+_PM_PARTS = {"afternoon", "evening", "tonight", "night"}
+_END_OF_DAY = (23, 59, 59)
+
+_WD = r"(mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun)(?:day|nesday|sday|rsday|urday)?"
+# Real spellings only: a bare prefix would read "decks" or "marketing" as a month
+_MON = (r"(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|"
+        r"sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)")
+_NUM = r"(\d+|an?|one|two|three|four|five|six|seven|eight|nine|ten|couple of|few)"
+
+_RE_IN = re.compile(rf"\bin\s+(?:a\s+)?{_NUM}\s+(min(?:ute)?s?|h(?:ou)?rs?|days?|weeks?)\b")
+_RE_ISO = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_RE_DAY_MONTH = re.compile(rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?{_MON}\b")
+_RE_MONTH_DAY = re.compile(rf"\b{_MON}\s+(\d{{1,2}})(?:st|nd|rd|th)?\b")
+_RE_ORDINAL_DAY = re.compile(r"\bthe\s+(\d{1,2})(?:st|nd|rd|th)\b")
+_RE_SLASH = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b")
+_RE_RELATIVE_DAY = re.compile(r"\b(day after tomorrow|tomorrow|tmrw|tmr|today|tonight|next week|this weekend|weekend|end of (?:the )?week|end of (?:the )?month)\b")
+_RE_WEEKDAY = re.compile(rf"\b(?:(next|this|coming)\s+)?{_WD}\b")
+_RE_CLOCK_12 = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)(?=\W|$)")
+_RE_CLOCK_24 = re.compile(r"\b([01]?\d|2[0-3]):([0-5]\d)\b")
+_RE_BARE_AT = re.compile(r"\bat\s+(\d{1,2})\b(?!\s*(?:am|pm|:|/|\d))")
+_RE_PART_OF_DAY = re.compile(r"\b(?:in the |this |at )?(morning|noon|afternoon|evening|tonight|midnight|night)\b")
+
+_RE_HIGH = re.compile(r"\b(urgent(?:ly)?|asap|a\.s\.a\.p|important|critical|high priority|top priority|immediately)\b|!{2,}")
+_RE_LOW = re.compile(r"\b(low priority|whenever|someday|eventually|no rush|if (?:i have|there's) time|not urgent)\b")
+_RE_ASSIGNMENT = re.compile(r"\b(exam|assignment|homework|hw|essay|quiz|test|lab|report|thesis|project|submission|submit|midterm|final|paper|study|revise|revision|lecture)\b")
+_RE_HABIT = re.compile(r"\b(every ?day|daily|every (?:morning|evening|night|week)|weekly|habit|each (?:morning|day|night)|routine)\b")
+
+# Words that suggest a time reference the rules above did not understand
+_RE_LEFTOVER_TIME = re.compile(
+    rf"\b\d+(?:[:/.]\d+)?\b(?!\s+[a-z])|\b\d+(?:st|nd|rd|th)\b|\b(next|last|this|before|after|until|till|by end|weeks?|months?|years?|days?|hours?|"
+    rf"o'?clock|{_MON}|{_WD})\b"
+)
+_RE_DANGLING = re.compile(r"(?:^|\s)(by|on|at|due|before|for|in|around|until|till|from|the|this|next)\s*$")
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+def _amount(word: str) -> int:
+    return int(word) if word.isdigit() else _NUMBER_WORDS[word]
+
+def _next_weekday(today: datetime, weekday: int, force_next_week: bool) -> datetime:
+    days_ahead = (weekday - today.weekday()) % 7
+    if days_ahead == 0 and force_next_week:
+        days_ahead = 7
+    return today + timedelta(days=days_ahead)
+
+def _local_parse(text: str, current_time: datetime) -> Tuple[dict, float]:
+    """
+    Rule-based extraction of title, category, priority and deadline.
+    Returns the parse and a 0-1 confidence; anything it can't account for lowers the score.
+    """
+    lowered = _normalize(text)
+    confidence = 1.0
+    spans = []
+    date: Optional[datetime] = None
+    exact: Optional[datetime] = None   # "in 2 hours" pins both date and time
+    clock: Optional[Tuple[int, int, int]] = None
+
+    def take(match):
+        spans.append(match.span())
+        return match
+
+    # 1. Relative offsets ("in 2 hours", "in three days")
+    m = _RE_IN.search(lowered)
+    if m:
+        take(m)
+        amount, unit = _amount(m.group(1)), m.group(2)
+        if unit.startswith("m"):
+            exact = current_time + timedelta(minutes=amount)
+        elif unit.startswith("h"):
+            exact = current_time + timedelta(hours=amount)
+        elif unit.startswith("d"):
+            date = current_time + timedelta(days=amount)
+        else:
+            date = current_time + timedelta(weeks=amount)
+
+    # 2. Calendar dates
+    if not (date or exact):
+        m = _RE_ISO.search(lowered)
+        if m:
+            take(m)
+            try:
+                date = datetime(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+            except ValueError:
+                confidence = 0.0
+    if not (date or exact):
+        m = _RE_DAY_MONTH.search(lowered) or _RE_MONTH_DAY.search(lowered)
+        if m:
+            take(m)
+            day, month = (m.group(1), m.group(2)) if m.re is _RE_DAY_MONTH else (m.group(2), m.group(1))
+            try:
+                date = datetime(current_time.year, _MONTHS.index(month[:3]) + 1, int(day))
+                if date.date() < current_time.date():
+                    date = date.replace(year=current_time.year + 1)
+            except ValueError:
+                confidence = 0.0
+    if not (date or exact):
+        m = _RE_ORDINAL_DAY.search(lowered)
+        if m:
+            # "on the 1st": the next time that day of the month comes round
+            take(m)
+            day, month_start = int(m.group(1)), current_time.replace(day=1)
+            for _ in range(12):
+                try:
+                    candidate = month_start.replace(day=day)
+                except ValueError:
+                    candidate = None
+                if candidate and candidate.date() >= current_time.date():
+                    date = candidate
+                    break
+                month_start = (month_start + timedelta(days=32)).replace(day=1)
+            else:
+                confidence = 0.0
+    if not (date or exact):
+        m = _RE_SLASH.search(lowered)
+        if m:
+            # 3/5 is March 5th or 3rd May depending on who typed it
+            take(m)
+            confidence = min(confidence, 0.5)
+
+    # 3. Named days ("tomorrow", "next friday", "end of week")
+    if not (date or exact):
+        m = _RE_RELATIVE_DAY.search(lowered)
+        if m:
+            take(m)
+            word = m.group(1)
+            if word in ("today", "tonight"):
+                # "tonight" is also a part of the day; step 4 picks up its hour
+                date = current_time
+            elif word in ("tomorrow", "tmrw", "tmr"):
+                date = current_time + timedelta(days=1)
+            elif word == "day after tomorrow":
+                date = current_time + timedelta(days=2)
+            elif word == "next week":
+                date = current_time + timedelta(weeks=1)
+            elif word.endswith("weekend"):
+                date = _next_weekday(current_time, 5, force_next_week=False)
+            elif word.endswith("week"):
+                date = _next_weekday(current_time, 4, force_next_week=False)
+            else:
+                first_of_next = (current_time.replace(day=1) + timedelta(days=32)).replace(day=1)
+                date = first_of_next - timedelta(days=1)
+    if not (date or exact):
+        m = _RE_WEEKDAY.search(lowered)
+        if m:
+            take(m)
+            weekday = [w[:3] for w in _WEEKDAYS].index(m.group(2)[:3])
+            date = _next_weekday(current_time, weekday, force_next_week=m.group(1) == "next")
+
+    # 4. Time of day. A part of the day ("tonight", "every morning") both sets the hour
+    # on its own and decides which half of the clock a bare "at 7" means
+    part = None
+    if not exact:
+        m = _RE_PART_OF_DAY.search(lowered)
+        if m:
+            take(m)
+            part = m.group(1)
+        m = _RE_CLOCK_12.search(lowered)
+        if m:
+            take(m)
+            hour, minute = int(m.group(1)), int(m.group(2) or 0)
+            if hour > 12 or minute > 59:
+                confidence = 0.0
+            else:
+                hour = hour % 12 + (12 if m.group(3).startswith("p") else 0)
+                clock = (hour, minute, 0)
+        else:
+            m = _RE_CLOCK_24.search(lowered)
+            if m:
+                take(m)
+                clock = (int(m.group(1)), int(m.group(2)), 0)
+            else:
+                m = _RE_BARE_AT.search(lowered)
+                if m:
+                    take(m)
+                    hour = int(m.group(1))
+                    if hour > 23:
+                        confidence = 0.0
+                    elif part in _AM_PARTS:
+                        clock = (hour % 12, 0, 0)
+                    elif part in _PM_PARTS:
+                        clock = (hour % 12 + 12 if hour <= 12 else hour, 0, 0)
+                    else:
+                        # "at 5" almost always means the afternoon, but it's a guess
+                        clock = (hour + 12 if 1 <= hour <= 7 else hour, 0, 0)
+                        confidence = min(confidence, 0.8)
+        if clock is None and part:
+            clock = (_PARTS_OF_DAY[part], 0, 0)
+
+    # 5. Resolve the deadline
+    if exact:
+        deadline = exact.replace(microsecond=0)
+    elif date:
+        deadline = date.replace(hour=clock[0], minute=clock[1], second=clock[2], microsecond=0) if clock \
+            else date.replace(hour=_END_OF_DAY[0], minute=_END_OF_DAY[1], second=_END_OF_DAY[2], microsecond=0)
+    elif clock:
+        # A bare time means the next time the clock shows it
+        deadline = current_time.replace(hour=clock[0], minute=clock[1], second=clock[2], microsecond=0)
+        if deadline <= current_time:
+            deadline += timedelta(days=1)
+    else:
+        deadline = (current_time + timedelta(days=3)).replace(
+            hour=_END_OF_DAY[0], minute=_END_OF_DAY[1], second=_END_OF_DAY[2], microsecond=0)
+        # No date or time at all: the three-day default is a placeholder, not a reading
+        confidence = min(confidence, 0.6)
+    if deadline <= current_time:
+        # "today at 9am" said at noon: the rules can't tell what was meant, so don't decide
+        confidence = min(confidence, 0.4)
+
+    # 6. Priority and category keywords
+    priority = "medium"
+    m = _RE_HIGH.search(lowered)
+    if m:
+        take(m)
+        priority = "high"
+    else:
+        m = _RE_LOW.search(lowered)
+        if m:
+            take(m)
+            priority = "low"
+
+    recurrence = None
+    m = _RE_HABIT.search(lowered)
+    if m:
+        take(m)
+        category = "habit"
+        # The deadline above becomes the series' first occurrence
+        recurrence = "FREQ=WEEKLY" if "week" in m.group(0) else "FREQ=DAILY"
+    elif _RE_ASSIGNMENT.search(lowered):
+        category = "assignment"
+    else:
+        category = "task"
+
+    # 7. Title = whatever is left once the date, time and priority phrases are cut out
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    residual = lowered
+    for start, end in reversed(merged):
+        residual = residual[:start] + " " + residual[end:]
+    residual = " ".join(residual.replace(",", " ").split())
+    while True:
+        trimmed = _RE_DANGLING.sub("", residual).strip(" -:;.")
+        if trimmed == residual:
+            break
+        residual = trimmed
+
+    if _RE_LEFTOVER_TIME.search(residual):
+        confidence = min(confidence, 0.5)
+    if not residual:
+        confidence = min(confidence, 0.3)
+    if len(lowered.split()) > 15:
+        # Long rambles are where the LLM's title rewriting earns its keep
+        confidence = min(confidence, 0.6)
+
+    # Keep the user's own casing for the title where we can
+    title = _restore_case(text, residual) or text.strip()
     return {
-        "title": text,
-        "category": "assignment" if "exam" in text_lower else "task",
-        "priority": "high" if "urgent" in text_lower else "medium",
-        "deadline": current_time + timedelta(days=3)
-    }
\ No newline at end of file
+        "title": title[:1].upper() + title[1:],
+        "category": category,
+        "priority": priority,
+        "deadline": deadline,
+        "recurrence": recurrence,
+    }, confidence
+
+def _restore_case(original: str, residual: str) -> str:
+    words = {w.lower().strip(",.!?"): w.strip(",.!?") for w in original.split()}
+    return " ".join(words.get(w, w) for w in residual.split())
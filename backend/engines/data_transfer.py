@@ -0,0 +1,202 @@
+"""
+1️⃣ Problem: Moving a user's data in or out meant building the whole task list in
+memory, and there was no way back in at all.
+
+4️⃣ Core Logic: one JSON object per line, {"type": "task" | "reflection", "data": {...}}.
+Export walks a server-side cursor and yields lines as rows arrive; import parses the
+request body as it streams in and writes fixed-size chunks, one transaction each,
+with a multi-row INSERT that skips IDs already present. Memory stays flat either way.
+Both directions are scoped to one user: exports hold only their rows and imports
+always land in their account, whatever user_id the file carries.
+"""
+import json
+import os
+from datetime import datetime
+from types import SimpleNamespace
+from typing import AsyncIterator, Dict, List, Tuple
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal
+import models, schemas
+from engines.workload_rollups import apply_task_deltas, task_load
+
+EXPORT_WINDOW = int(os.getenv("EXPORT_WINDOW", "2000"))
+IMPORT_CHUNK = int(os.getenv("IMPORT_CHUNK", "5000"))
+MAX_REPORTED_ERRORS = 20
+
+# NDJSON record type -> table; export order matters only for readability
+TABLES = {
+    "task": models.Task.__table__,
+    "reflection": models.UserReflection.__table__,
+}
+
+# Each line's data is checked (and coerced) against these before it can reach a chunk
+IMPORT_SCHEMAS = {
+    "task": schemas.TaskImport,
+    "reflection": schemas.ReflectionImport,
+}
+
+def _encode(kind: str, row: dict) -> str:
+    data = {k: v.isoformat() if isinstance(v, datetime) else v for k, v in row.items()}
+    return json.dumps({"type": kind, "data": data}, separators=(",", ":")) + "\n"
+
+async def export_ndjson(user_id: str, kinds: List[str]) -> AsyncIterator[str]:
+    """
+    Yields the user's rows of the requested tables as NDJSON. Opens its own session:
+    the response outlives the request's dependency-scoped one.
+    """
+    async with AsyncSessionLocal() as db:
+        for kind in kinds:
+            table = TABLES[kind]
+            result = await db.stream(
+                select(table).where(table.c.user_id == user_id).order_by(*table.primary_key.columns)
+                .execution_options(yield_per=EXPORT_WINDOW)
+            )
+            async for partition in result.mappings().partitions():
+                # One chunk per window keeps the number of socket writes low
+                yield "".join(_encode(kind, row) for row in partition)
+
+def _decode(line: bytes, user_id: str) -> tuple:
+    """Parses one NDJSON line into (kind, row) owned by user_id. Raises ValueError on anything malformed."""
+    record = json.loads(line)
+    kind = record.get("type") if isinstance(record, dict) else None
+    data = record.get("data") if kind in TABLES else None
+    if not isinstance(data, dict):
+        raise ValueError("expected {\"type\": \"task\"|\"reflection\", \"data\": {...}}")
+
+    columns = TABLES[kind].columns
+    unknown = set(data) - set(columns.keys())
+    if unknown:
+        raise ValueError(f"unknown {kind} fields: {', '.join(sorted(unknown))}")
+
+    try:
+        # Only the fields the line set: the column defaults below fill the rest
+        row = IMPORT_SCHEMAS[kind].model_validate(data).model_dump(exclude_unset=True)
+    except ValidationError as e:
+        raise ValueError("; ".join(
+            f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+        ))
+    row["user_id"] = user_id
+    # Fill column defaults (id, created_at, completed, ...) that the line left out
+    for column in columns:
+        if column.name not in row and column.default is not None:
+            default = column.default.arg
+            row[column.name] = default(None) if callable(default) else default
+    if kind == "task" and row.get("completed") and not row.get("completed_at"):
+        # Files from before completed_at existed: the last write is the best guess
+        row["completed_at"] = row.get("updated_at") or datetime.utcnow()
+    if kind == "task":
+        # The import is the write: delta-sync watermarks and the list ETag must see it
+        row["updated_at"] = datetime.utcnow()
+    return kind, row
+
+async def _insert_rows(db: AsyncSession, kind: str, rows: List[dict]) -> int:
+    """Inserts rows in one transaction. Returns how many were new."""
+    table = TABLES[kind]
+    insert_fn = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+
+    # Rows sharing a key set share one executemany-friendly statement
+    by_keys: Dict[tuple, List[dict]] = {}
+    for row in rows:
+        by_keys.setdefault(tuple(sorted(row)), []).append(row)
+
+    inserted = []
+    for group in by_keys.values():
+        stmt = insert_fn(table).on_conflict_do_nothing(index_elements=["id"]).returning(table.c.id)
+        result = await db.execute(stmt, group)
+        inserted.extend(result.scalars().all())
+
+    if kind == "task" and inserted:
+        # Imported open tasks count toward the workload rollups like any other write
+        new_ids = set(inserted)
+        await apply_task_deltas(db, [
+            (None, task_load(SimpleNamespace(**row))) for row in rows if row["id"] in new_ids
+        ])
+    await db.commit()
+    return len(inserted)
+
+async def _write_chunk(db: AsyncSession, kind: str, rows: List[dict]) -> Tuple[int, List[int]]:
+    """
+    Inserts one chunk in its own transaction. Returns how many rows were new and the
+    positions of rows the database rejected. When a row breaks a constraint other than
+    the id (say, a second row for one habit occurrence), the chunk is retried row by
+    row so only the offending lines are lost.
+    """
+    try:
+        return await _insert_rows(db, kind, rows), []
+    except IntegrityError:
+        await db.rollback()
+    inserted, rejected = 0, []
+    for i, row in enumerate(rows):
+        try:
+            inserted += await _insert_rows(db, kind, [row])
+        except IntegrityError:
+            await db.rollback()
+            rejected.append(i)
+    return inserted, rejected
+
+async def import_ndjson(db: AsyncSession, user_id: str, body: AsyncIterator[bytes],
+                        chunk_size: int = IMPORT_CHUNK) -> dict:
+    """
+    Consumes a streamed NDJSON body. Complete chunks are committed as they fill,
+    so a failure late in a large file keeps everything before it.
+    """
+    # (line number, row) per record type, so rejected rows can be reported by line
+    buffers: Dict[str, List[tuple]] = {kind: [] for kind in TABLES}
+    counts = {kind: {"inserted": 0, "skipped": 0} for kind in TABLES}
+    errors: List[dict] = []
+    error_count = 0
+    line_no = 0
+    pending = b""
+
+    def invalid(line: int, error: str):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"line": line, "error": error[:200]})
+
+    async def flush(kind: str):
+        buffered = buffers[kind]
+        if buffered:
+            inserted, rejected = await _write_chunk(db, kind, [row for _, row in buffered])
+            counts[kind]["inserted"] += inserted
+            counts[kind]["skipped"] += len(buffered) - inserted - len(rejected)
+            for i in rejected:
+                invalid(buffered[i][0], "conflicts with an existing row")
+            buffers[kind] = []
+
+    async def handle(line: bytes):
+        nonlocal line_no
+        line_no += 1
+        if not line.strip():
+            return
+        try:
+            kind, row = _decode(line, user_id)
+        except (ValueError, TypeError) as e:
+            invalid(line_no, str(e))
+            return
+        buffers[kind].append((line_no, row))
+        if len(buffers[kind]) >= chunk_size:
+            await flush(kind)
+
+    async for chunk in body:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            await handle(line)
+    if pending.strip():
+        await handle(pending)
+    for kind in TABLES:
+        await flush(kind)
+
+    return {
+        "tasks": counts["task"],
+        "reflections": counts["reflection"],
+        "lines": line_no,
+        "invalid": error_count,
+        "errors": errors,
+    }
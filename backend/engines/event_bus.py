@@ -0,0 +1,106 @@
+"""
+1️⃣ Problem: The app re-fetched the whole task list after every mutation and on
+every screen focus, so the backend kept answering the same large query.
+
+4️⃣ Core Logic: write paths publish small change events to an in-process bus;
+GET /api/events relays them over Server-Sent Events. Recent events sit in a ring
+buffer so a reconnecting client resumes from Last-Event-ID, and each client gets
+a bounded queue: one that falls behind is cut loose with a "reset" event telling
+it to refetch once, instead of the server buffering without limit.
+
+The bus is per process. With several workers a client only hears about writes
+its own worker handled, so multi-worker deployments should treat events as a
+hint and keep the ETag-checked sync endpoint as the source of truth.
+"""
+import asyncio
+import json
+import os
+import uuid
+from collections import deque
+from typing import AsyncIterator, Optional
+
+REPLAY_SIZE = int(os.getenv("EVENTS_REPLAY_SIZE", "1000"))
+CLIENT_BUFFER = int(os.getenv("EVENTS_CLIENT_BUFFER", "256"))
+HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+
+def _format(event_id: Optional[str], event: str, data: dict) -> str:
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, default=str, separators=(',', ':'))}\n\n"
+
+class _Subscriber:
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=CLIENT_BUFFER)
+        self.overflowed = False
+
+class EventBus:
+    """Fan-out of change events to each user's SSE clients, with a short shared replay history."""
+
+    def __init__(self, replay_size: int = REPLAY_SIZE):
+        # Event ids are "<boot>-<seq>" so an id from before a restart is never mistaken for a current one
+        self.boot = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.history: deque = deque(maxlen=replay_size)
+        self.subscribers: set = set()
+
+    def publish(self, user_id: str, event: str, data: dict):
+        """Queues an event for the user's clients. Call from the event loop (route handlers)."""
+        self.seq += 1
+        frame = (self.seq, user_id, _format(f"{self.boot}-{self.seq}", event, data))
+        self.history.append(frame)
+        for sub in self.subscribers:
+            if sub.overflowed or sub.user_id != user_id:
+                continue
+            try:
+                sub.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                sub.overflowed = True
+
+    def _replay_after(self, user_id: str, last_event_id: Optional[str]) -> Optional[list]:
+        """Frames after last_event_id, or None when the history can't bridge the gap."""
+        if not last_event_id:
+            return []
+        boot, _, seq = last_event_id.partition("-")
+        if boot != self.boot or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if seq >= self.seq:
+            return []
+        if not self.history or self.history[0][0] > seq + 1:
+            return None
+        return [frame for frame in self.history if frame[0] > seq and frame[1] == user_id]
+
+    async def stream(self, user_id: str, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+        sub = _Subscriber(user_id)
+        # Subscribe and snapshot the replay with no await in between, so every
+        # event lands in exactly one of the two
+        self.subscribers.add(sub)
+        replay = self._replay_after(user_id, last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+            if replay is None:
+                yield _format(None, "reset", {"reason": "history_gap"})
+            for _, _, frame in replay or []:
+                yield frame
+
+            while True:
+                try:
+                    _, _, frame = await asyncio.wait_for(sub.queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    frame = ": ping\n\n"
+                if sub.overflowed:
+                    # Events were dropped for this client; one refetch beats a partial picture
+                    yield _format(None, "reset", {"reason": "slow_consumer"})
+                    return
+                yield frame
+        finally:
+            self.subscribers.discard(sub)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self.subscribers),
+            "last_event_id": f"{self.boot}-{self.seq}" if self.seq else None,
+            "history": len(self.history),
+        }
+
+event_bus = EventBus()
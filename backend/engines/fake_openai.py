@@ -0,0 +1,63 @@
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+class FakeOpenAIError(Exception):
+    """Stands in for openai.APIError."""
+
+def _completion(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+def _task_for(text: str) -> dict:
+    deadline = (datetime.utcnow() + timedelta(days=3)).replace(hour=23, minute=59, second=59, microsecond=0)
+    return {"title": text.strip()[:80] or "Untitled", "category": "task", "priority": "medium",
+            "deadline": deadline.isoformat()}
+
+class _FakeCompletions:
+    def __init__(self, owner):
+        self.owner = owner
+
+    async def create(self, model: str, messages: list, **kwargs):
+        return await self.owner._handle(messages)
+
+class FakeAsyncOpenAI:
+    """
+    Drop-in for AsyncOpenAI covering chat.completions.create as the engines call it.
+    Answers are shaped from the prompt (single capture, batched capture, burnout
+    suggestion); latency and failure rate are seeded so benchmark runs repeat.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, failure_rate: float = 0.0, seed: int = None):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.failures = 0
+        self.chat = SimpleNamespace(completions=_FakeCompletions(self))
+
+    async def _handle(self, messages: list):
+        self.calls += 1
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        fail = self.random.random() < self.failure_rate
+        if delay:
+            await asyncio.sleep(delay)
+        if fail:
+            self.failures += 1
+            raise FakeOpenAIError("500 Internal Server Error (simulated)")
+
+        system = messages[0]["content"]
+        user = messages[1]["content"] if len(messages) > 1 else ""
+        if "JSON array" in system:
+            return _completion(json.dumps({"tasks": [_task_for(t) for t in json.loads(user)]}))
+        if len(messages) > 1:
+            return _completion(json.dumps(_task_for(user)))
+        return _completion(json.dumps({
+            "title": "Lighter Evening",
+            "description": "Moved one task off tonight's list, as you asked on the call.",
+        }))
+
+    async def close(self):
+        pass
@@ -0,0 +1,44 @@
+import random
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+class FakeTwilioError(Exception):
+    """Stands in for twilio.base.exceptions.TwilioRestException."""
+
+class _FakeResource:
+    def __init__(self, owner, prefix: str):
+        self.owner = owner
+        self.prefix = prefix
+
+    def create(self, **kwargs):
+        return self.owner._handle(self.prefix, kwargs)
+
+class FakeTwilioClient:
+    """
+    Drop-in for twilio.rest.Client covering the calls the app makes
+    (messages.create, calls.create). Latency and failure rate are configurable
+    so outbox throughput and retry behaviour can be measured offline.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, failure_rate: float = 0.0, seed: int = None):
+        self.latency = latency_ms / 1000
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.sent = []
+        self.failures = 0
+        self._lock = threading.Lock()
+        self.messages = _FakeResource(self, "SM")
+        self.calls = _FakeResource(self, "CA")
+
+    def _handle(self, prefix: str, payload: dict):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if self.random.random() < self.failure_rate:
+                self.failures += 1
+                raise FakeTwilioError("503 Service Unavailable (simulated)")
+            sid = f"{prefix}{uuid.uuid4().hex}"
+            self.sent.append({"sid": sid, **payload})
+        return SimpleNamespace(sid=sid, status="queued")
@@ -0,0 +1,246 @@
+"""
+1️⃣ Problem: main.py built two BackgroundSchedulers and every uvicorn worker ran
+its own, so each reminder and evening call went out once per process.
+
+4️⃣ Core Logic: one scheduler per process, backed by a job store in the app
+database, started paused. A heartbeat thread races the other workers for a row
+in scheduler_leases; only the lease holder resumes its scheduler, and a worker
+that stops renewing loses the lease to the next one. Jobs run on a bounded
+thread pool, and scheduler events feed per-job latency and misfire counters,
+shown on /api/scheduler/status and exported on /metrics.
+"""
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from apscheduler.events import (
+    EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED,
+)
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from database import engine
+from engines import metrics
+import models
+
+LEASE_NAME = "job-scheduler"
+LEASE_TTL_SECONDS = int(os.getenv("SCHEDULER_LEASE_TTL", "30"))
+# Renew well inside the TTL so one slow heartbeat doesn't hand the lease away
+HEARTBEAT_SECONDS = LEASE_TTL_SECONDS / 3
+JOB_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "4"))
+MISFIRE_GRACE_SECONDS = int(os.getenv("SCHEDULER_MISFIRE_GRACE", "300"))
+# Zone the cron hours below are read in (e.g. "Asia/Kolkata"); unset means the server's local time
+SCHEDULER_TZ = os.getenv("SCHEDULER_TZ") or None
+
+# Set EVENING_CALL_INTERVAL_MINUTES=5 for the demo; otherwise the call goes out once a night
+EVENING_CALL_INTERVAL_MINUTES = os.getenv("EVENING_CALL_INTERVAL_MINUTES")
+EVENING_CALL_HOUR = int(os.getenv("EVENING_CALL_HOUR", "21"))
+EVENING_CALL_MINUTE = int(os.getenv("EVENING_CALL_MINUTE", "0"))
+# Archive finished tasks in the quiet hours
+ARCHIVE_HOUR = int(os.getenv("ARCHIVE_HOUR", "3"))
+
+metrics.registry.describe("job_lag_seconds", "How late a scheduled job started compared with when it was due")
+metrics.registry.describe("job_duration_seconds", "Scheduled job run time")
+metrics.registry.describe("job_runs_total", "Scheduled job runs by outcome")
+metrics.registry.describe("job_misfires_total", "Scheduled runs missed by more than the grace time")
+metrics.registry.describe("job_skipped_overlaps_total", "Runs skipped because the previous one was still going")
+
+def _export(kind: str, name: str, job_id: str, value: float = 1, **labels):
+    """Mirrors a job event into the /metrics registry."""
+    if not metrics.ENABLED:
+        return
+    key = (("job", job_id),) + tuple(sorted(labels.items()))
+    if kind == "observe":
+        metrics.registry.observe(name, value, key)
+    else:
+        metrics.registry.inc(name, key, value)
+
+class JobMetrics:
+    """Per-job run counts, start lag, run time and misfires for this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.started = {}
+
+    def _job(self, job_id: str) -> dict:
+        return self.jobs.setdefault(job_id, {
+            "runs": 0, "errors": 0, "misfires": 0, "skipped_overlaps": 0,
+            "last_lag_ms": None, "max_lag_ms": 0.0,
+            "last_duration_ms": None, "max_duration_ms": 0.0, "total_duration_ms": 0.0,
+            "last_run_at": None,
+        })
+
+    def on_event(self, event):
+        with self.lock:
+            job = self._job(event.job_id)
+            if event.code == EVENT_JOB_SUBMITTED:
+                # Lag: how late the job started compared with when it was due
+                lag_ms = (datetime.now(timezone.utc) - event.scheduled_run_times[-1]).total_seconds() * 1000
+                job["last_lag_ms"] = round(lag_ms, 1)
+                job["max_lag_ms"] = round(max(job["max_lag_ms"], lag_ms), 1)
+                self.started[event.job_id] = time.perf_counter()
+                _export("observe", "job_lag_seconds", event.job_id, max(lag_ms, 0) / 1000)
+            elif event.code in (EVENT_JOB_EXECUTED, EVENT_JOB_ERROR):
+                started = self.started.pop(event.job_id, None)
+                job["runs"] += 1
+                job["errors"] += event.code == EVENT_JOB_ERROR
+                job["last_run_at"] = datetime.utcnow().isoformat()
+                _export("inc", "job_runs_total", event.job_id,
+                        outcome="error" if event.code == EVENT_JOB_ERROR else "ok")
+                if started is not None:
+                    duration_ms = (time.perf_counter() - started) * 1000
+                    job["last_duration_ms"] = round(duration_ms, 1)
+                    job["max_duration_ms"] = round(max(job["max_duration_ms"], duration_ms), 1)
+                    job["total_duration_ms"] += duration_ms
+                    _export("observe", "job_duration_seconds", event.job_id, duration_ms / 1000)
+            elif event.code == EVENT_JOB_MISSED:
+                job["misfires"] += 1
+                _export("inc", "job_misfires_total", event.job_id)
+            elif event.code == EVENT_JOB_MAX_INSTANCES:
+                job["skipped_overlaps"] += 1
+                _export("inc", "job_skipped_overlaps_total", event.job_id)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            out = {}
+            for job_id, job in self.jobs.items():
+                avg = job["total_duration_ms"] / job["runs"] if job["runs"] else None
+                out[job_id] = {**job, "avg_duration_ms": round(avg, 1) if avg is not None else None}
+                del out[job_id]["total_duration_ms"]
+            return out
+
+class JobScheduler:
+    """Owns the process's APScheduler instance and its claim on the leader lease."""
+
+    def __init__(self):
+        self.holder = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self.metrics = JobMetrics()
+        self.scheduler = BackgroundScheduler(
+            jobstores={"default": SQLAlchemyJobStore(engine=engine, tablename="apscheduler_jobs")},
+            executors={"default": ThreadPoolExecutor(max_workers=JOB_WORKERS)},
+            job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": MISFIRE_GRACE_SECONDS},
+            timezone=SCHEDULER_TZ,
+        )
+        self.scheduler.add_listener(
+            self.metrics.on_event,
+            EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES,
+        )
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def _ensure_job(self, func: str, trigger, job_id: str):
+        """
+        Adds the job, or replaces it when its function, trigger or zone changed. An
+        unchanged job is left alone: re-adding an interval job would restart its
+        clock, so frequent restarts could keep pushing it back forever.
+        """
+        existing = self.scheduler.get_job(job_id)
+        if (existing and existing.func_ref == func and str(existing.trigger) == str(trigger)
+                and str(existing.trigger.timezone) == str(trigger.timezone)):
+            return
+        self.scheduler.add_job(func, trigger, id=job_id, replace_existing=True)
+
+    def register_jobs(self):
+        """
+        Makes the store match the app's jobs by id. Every worker does this at startup,
+        so the store always matches the deployed code; textual refs keep them picklable.
+        """
+        ensure = self._ensure_job
+        ensure("engines.reminders:send_pending_task_reminder", IntervalTrigger(hours=6, timezone=SCHEDULER_TZ),
+               "pending-task-reminder")
+        ensure("engines.notifier:drain_outbox",
+               IntervalTrigger(seconds=int(os.getenv("OUTBOX_DRAIN_SECONDS", "30")), timezone=SCHEDULER_TZ), "drain-outbox")
+        if EVENING_CALL_INTERVAL_MINUTES:
+            evening = IntervalTrigger(minutes=int(EVENING_CALL_INTERVAL_MINUTES), timezone=SCHEDULER_TZ)
+        else:
+            evening = CronTrigger(hour=EVENING_CALL_HOUR, minute=EVENING_CALL_MINUTE, timezone=SCHEDULER_TZ)
+        ensure("engines.reminders:trigger_evening_call", evening, "evening-call")
+        ensure("engines.archiver:archive_completed_tasks", CronTrigger(hour=ARCHIVE_HOUR, timezone=SCHEDULER_TZ),
+               "archive-completed-tasks")
+
+    def start(self):
+        # Paused until this process wins the lease; followers never execute jobs
+        self.scheduler.start(paused=True)
+        self.register_jobs()
+        self._heartbeat = threading.Thread(target=self._run_heartbeat, name="scheduler-lease", daemon=True)
+        self._heartbeat.start()
+
+    def shutdown(self):
+        self._stop.set()
+        if self._heartbeat:
+            self._heartbeat.join(timeout=HEARTBEAT_SECONDS)
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+        if self.is_leader:
+            self._release()
+
+    def _run_heartbeat(self):
+        while not self._stop.is_set():
+            try:
+                leader = self._try_acquire()
+            except Exception as e:
+                # Can't reach the database: stop running jobs rather than risk a second leader
+                print(f"⚠️ Scheduler lease check failed: {e}")
+                leader = False
+            if leader and not self.is_leader:
+                print(f"👑 Scheduler leader: {self.holder}")
+                self.scheduler.resume()
+            elif not leader and self.is_leader:
+                print(f"Scheduler lease lost by {self.holder}")
+                self.scheduler.pause()
+            self.is_leader = leader
+            self._stop.wait(HEARTBEAT_SECONDS)
+
+    def _try_acquire(self) -> bool:
+        """Takes or renews the lease. Returns whether this process holds it."""
+        lease = models.SchedulerLease
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=LEASE_TTL_SECONDS)
+        with engine.begin() as conn:
+            renewed = conn.execute(
+                update(lease)
+                .where(lease.name == LEASE_NAME, or_(lease.holder == self.holder, lease.expires_at < now))
+                .values(holder=self.holder, expires_at=expires_at)
+            )
+            if renewed.rowcount:
+                return True
+            insert_fn = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+            created = conn.execute(
+                insert_fn(lease)
+                .values(name=LEASE_NAME, holder=self.holder, expires_at=expires_at)
+                .on_conflict_do_nothing(index_elements=["name"])
+            )
+            return created.rowcount > 0
+
+    def _release(self):
+        """Expires our lease on shutdown so the next worker takes over at its next heartbeat."""
+        lease = models.SchedulerLease
+        with engine.begin() as conn:
+            conn.execute(
+                update(lease)
+                .where(lease.name == LEASE_NAME, lease.holder == self.holder)
+                .values(expires_at=datetime.utcnow())
+            )
+        self.is_leader = False
+
+    def status(self) -> dict:
+        jobs = [{
+            "id": job.id,
+            "next_run_time": job.next_run_time.isoformat() if job.next_run_time else None,
+        } for job in self.scheduler.get_jobs()] if self.scheduler.running else []
+        return {
+            "holder": self.holder,
+            "is_leader": self.is_leader,
+            "jobs": jobs,
+            "metrics": self.metrics.snapshot(),
+        }
+
+job_scheduler = JobScheduler()
@@ -0,0 +1,204 @@
+"""
+1️⃣ Problem: The only runtime signal was print(); nobody could say which route or
+planner stage was slow, or how often capture fell through to the LLM.
+
+4️⃣ Core Logic: fixed-bucket histograms and counters kept in process memory and
+rendered in Prometheus text format on /metrics. A pure ASGI middleware times every
+request by route template; span() times named stages inside handlers. With
+METRICS_ENABLED=0 the middleware is not installed and span() hands back a shared
+no-op, so the cost is one attribute lookup.
+
+PROFILE_SLOW_MS turns on the sampling profiler hook: PROFILE_SAMPLE_RATE of
+requests run under pyinstrument, and the ones slower than the threshold are saved
+as HTML flame graphs in PROFILE_DIR.
+"""
+import bisect
+import os
+import random
+import threading
+import time
+from typing import Dict, Tuple
+
+ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.05"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# Seconds; spans the 1 ms in-memory cache hit up to a 10 s OpenAI call
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+class Registry:
+    """Every metric this process records, keyed by (name, sorted labels)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.gauges: Dict[Tuple[str, Labels], float] = {}
+        self.help: Dict[str, str] = {}
+
+    def observe(self, name: str, seconds: float, labels: Labels = ()):
+        with self.lock:
+            hist = self.histograms.get((name, labels))
+            if hist is None:
+                hist = self.histograms[(name, labels)] = Histogram()
+            hist.observe(seconds)
+
+    def inc(self, name: str, labels: Labels = (), amount: float = 1):
+        with self.lock:
+            self.counters[(name, labels)] = self.counters.get((name, labels), 0) + amount
+
+    def add_gauge(self, name: str, labels: Labels, amount: float):
+        with self.lock:
+            self.gauges[(name, labels)] = self.gauges.get((name, labels), 0) + amount
+
+    def describe(self, name: str, text: str):
+        self.help[name] = text
+
+    def render(self) -> str:
+        """Prometheus text exposition format, version 0.0.4."""
+        def fmt(labels: Labels, extra: str = "") -> str:
+            parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+            if extra:
+                parts.append(extra)
+            return "{" + ",".join(parts) + "}" if parts else ""
+
+        lines = []
+        with self.lock:
+            for kind, series in (("counter", self.counters), ("gauge", self.gauges)):
+                for name in sorted({n for n, _ in series}):
+                    lines += _header(name, kind, self.help.get(name))
+                    lines += [f"{name}{fmt(l)} {v:g}" for (n, l), v in sorted(series.items()) if n == name]
+            for name in sorted({n for n, _ in self.histograms}):
+                lines += _header(name, "histogram", self.help.get(name))
+                for (n, labels), hist in sorted(self.histograms.items(), key=lambda item: item[0]):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS + (float("inf"),), hist.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        bucket_labels = fmt(labels, f'le="{le}"')
+                        lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                    lines.append(f"{name}_sum{fmt(labels)} {hist.total:.6f}")
+                    lines.append(f"{name}_count{fmt(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+def _header(name: str, kind: str, help_text: str = None) -> list:
+    return ([f"# HELP {name} {help_text}"] if help_text else []) + [f"# TYPE {name} {kind}"]
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+registry = Registry()
+registry.describe("http_request_duration_seconds", "Request latency by route template")
+registry.describe("http_requests_in_flight", "Requests currently being handled")
+registry.describe("stage_duration_seconds", "Time spent in a named stage of a handler or engine")
+registry.describe("events_total", "Counted outcomes, e.g. which path a capture took")
+
+class _Span:
+    __slots__ = ("labels", "started")
+
+    def __init__(self, labels: Labels):
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registry.observe("stage_duration_seconds", time.perf_counter() - self.started, self.labels)
+        return False
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+def span(stage: str, **labels):
+    """
+    Times a block as stage_duration_seconds{stage=...}. Works inside async code
+    too; it measures wall time, awaits included.
+    """
+    if not ENABLED:
+        return _NO_SPAN
+    return _Span((("stage", stage),) + tuple(sorted(labels.items())))
+
+def count(name: str, **labels):
+    """Bumps events_total{event=name, ...}."""
+    if ENABLED:
+        registry.inc("events_total", (("event", name),) + tuple(sorted(labels.items())))
+
+def _load_profiler():
+    if not PROFILE_SLOW_MS:
+        return None
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        print("⚠️ PROFILE_SLOW_MS is set but pyinstrument isn't installed; profiling disabled")
+        return None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    return Profiler
+
+class MetricsMiddleware:
+    """Times each HTTP request by route template and keeps an in-flight gauge."""
+
+    def __init__(self, app):
+        self.app = app
+        self.profiler = _load_profiler()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        profiler = None
+        if self.profiler and random.random() < PROFILE_SAMPLE_RATE:
+            profiler = self.profiler(async_mode="enabled")
+            profiler.start()
+
+        method = scope["method"]
+        # The route is only known after routing, so in-flight is tracked per method
+        in_flight = (("method", method),)
+        registry.add_gauge("http_requests_in_flight", in_flight, 1)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            registry.add_gauge("http_requests_in_flight", in_flight, -1)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            registry.observe("http_request_duration_seconds", elapsed, (
+                ("method", method), ("route", route), ("status", str(status["code"])),
+            ))
+            if profiler:
+                profiler.stop()
+                if elapsed * 1000 >= PROFILE_SLOW_MS:
+                    name = f"{int(time.time())}-{method}-{route.strip('/').replace('/', '_') or 'root'}.html"
+                    with open(os.path.join(PROFILE_DIR, name), "w") as f:
+                        f.write(profiler.output_html())
@@ -0,0 +1,194 @@
+"""
+1️⃣ Problem: SMS reminders and evening calls went out inline from scheduler
+threads — one blocking Twilio request each, no retry, and a crash mid-send
+lost the notification.
+
+4️⃣ Core Logic: callers write a row to notification_outbox (deduplicated by
+idempotency key) and drain_outbox() delivers due rows in batches: claim with a
+lease, send through a small thread pool behind a token bucket, then record
+successes and reschedule failures with exponential backoff.
+"""
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional, Sequence
+from sqlalchemy import and_, bindparam, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from clients import get_twilio
+from database import SessionLocal
+from engines.call_scripts import call_scripts
+import models
+
+BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+WORKERS = int(os.getenv("OUTBOX_WORKERS", "4"))
+# Twilio's default long-code limit is about 1 message/second; short codes go far higher
+RATE_PER_SECOND = float(os.getenv("OUTBOX_RATE_PER_SECOND", "1"))
+BURST = int(os.getenv("OUTBOX_BURST", "5"))
+MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+BACKOFF_BASE_SECONDS = float(os.getenv("OUTBOX_BACKOFF_BASE", "30"))
+BACKOFF_CAP_SECONDS = float(os.getenv("OUTBOX_BACKOFF_CAP", "3600"))
+# A row left in 'sending' longer than this belongs to a worker that died
+CLAIM_LEASE_SECONDS = int(os.getenv("OUTBOX_CLAIM_LEASE", "300"))
+
+TWILIO_NUMBER = os.getenv("TWILIO_PHONE_NUMBER") or os.getenv("TWILIO_NUMBER")
+
+class TokenBucket:
+    """Thread-safe token bucket: acquire() blocks until a send is allowed."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+_bucket = TokenBucket(RATE_PER_SECOND, BURST)
+
+def enqueue(db: Session, channel: str, to: str, idempotency_key: str, body: str = None, url: str = None,
+            twiml: str = None, outbox_id: str = None) -> bool:
+    """
+    Adds a notification to the outbox on the caller's session; it is sent once
+    the caller commits. A repeated idempotency key is a no-op. Returns whether a row was added.
+    Pass outbox_id to know the row's id up front (to put it in a call's webhook URL).
+    """
+    insert_fn = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+    stmt = insert_fn(models.NotificationOutbox).values(
+        id=outbox_id or str(uuid.uuid4()),
+        idempotency_key=idempotency_key,
+        channel=channel,
+        to_number=to,
+        body=body,
+        url=url,
+        twiml=twiml,
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+        created_at=datetime.utcnow(),
+    ).on_conflict_do_nothing(index_elements=["idempotency_key"])
+    return db.execute(stmt).rowcount > 0
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff with full jitter, capped."""
+    return random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempts - 1)))
+
+def _claim(db: Session, now: datetime, batch_size: int, only: Optional[Sequence[str]] = None) -> list:
+    """Marks up to batch_size due rows (of `only`, when given) as ours, so concurrent drainers never double-send."""
+    token = uuid.uuid4().hex
+    outbox = models.NotificationOutbox
+    due = select(outbox.id).where(or_(
+        and_(outbox.status == "pending", outbox.next_attempt_at <= now),
+        and_(outbox.status == "sending", outbox.claimed_at < now - timedelta(seconds=CLAIM_LEASE_SECONDS)),
+    )).order_by(outbox.next_attempt_at).limit(batch_size)
+    if only is not None:
+        due = due.where(outbox.id.in_(list(only)))
+    ids = db.scalars(due).all()
+    if not ids:
+        return []
+
+    # Re-check the status in the UPDATE: another drainer may have claimed some of these meanwhile
+    db.execute(
+        update(outbox)
+        .where(outbox.id.in_(ids), outbox.status.in_(("pending", "sending")),
+               or_(outbox.claimed_by.is_(None), outbox.claimed_at < now - timedelta(seconds=CLAIM_LEASE_SECONDS)))
+        .values(status="sending", claimed_by=token, claimed_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return db.scalars(select(outbox).where(outbox.claimed_by == token)).all()
+
+def _send(row: models.NotificationOutbox):
+    """Runs on a worker thread. Returns (id, sid, error) — never raises."""
+    try:
+        # A bad credential fails here; it must count as an attempt, not strand the claimed batch
+        client = get_twilio()
+        _bucket.acquire()
+        if row.channel == "call":
+            result = client.calls.create(to=row.to_number, from_=TWILIO_NUMBER, url=row.url, method="POST")
+            if row.twiml:
+                # Ready before Twilio can possibly ring back for it
+                call_scripts.put(result.sid, row.twiml)
+        else:
+            result = client.messages.create(body=row.body, from_=TWILIO_NUMBER, to=row.to_number)
+        return row.id, result.sid, None
+    except Exception as e:
+        return row.id, None, str(e)[:500]
+
+def drain_outbox(batch_size: int = BATCH_SIZE, workers: int = WORKERS, max_batches: Optional[int] = None,
+                 only: Optional[Sequence[str]] = None) -> dict:
+    """
+    Delivers everything currently due, one claimed batch at a time.
+    Safe to call from several processes; each batch costs three round trips.
+    Pass `only` (outbox ids) to deliver just those rows and leave the rest to the drain job.
+    """
+    stats = {"sent": 0, "retried": 0, "failed": 0}
+    if only is not None and not only:
+        return stats
+    outbox = models.NotificationOutbox
+    batches = 0
+    with SessionLocal() as db, ThreadPoolExecutor(max_workers=workers, thread_name_prefix="outbox") as pool:
+        while max_batches is None or batches < max_batches:
+            now = datetime.utcnow()
+            rows = _claim(db, now, batch_size, only)
+            if not rows:
+                break
+            batches += 1
+            attempts = {row.id: row.attempts + 1 for row in rows}
+            # Detach the rows so worker threads only read plain attributes
+            db.expunge_all()
+
+            sent, retry, dead = [], [], []
+            for row_id, sid, error in pool.map(_send, rows):
+                if error is None:
+                    sent.append({"b_id": row_id, "sid": sid, "attempts": attempts[row_id], "sent_at": datetime.utcnow()})
+                elif attempts[row_id] >= MAX_ATTEMPTS:
+                    dead.append({"b_id": row_id, "attempts": attempts[row_id], "error": error})
+                else:
+                    retry.append({
+                        "b_id": row_id, "attempts": attempts[row_id], "error": error,
+                        "next_at": datetime.utcnow() + timedelta(seconds=backoff_delay(attempts[row_id])),
+                    })
+
+            # 1. Record outcomes with one executemany per outcome
+            table = outbox.__table__
+            where = table.c.id == bindparam("b_id")
+            if sent:
+                db.execute(update(table).where(where).values(
+                    status="sent", provider_sid=bindparam("sid"), attempts=bindparam("attempts"),
+                    sent_at=bindparam("sent_at"), claimed_by=None, last_error=None,
+                ), sent)
+            if retry:
+                db.execute(update(table).where(where).values(
+                    status="pending", attempts=bindparam("attempts"), last_error=bindparam("error"),
+                    next_attempt_at=bindparam("next_at"), claimed_by=None,
+                ), retry)
+            if dead:
+                db.execute(update(table).where(where).values(
+                    status="failed", attempts=bindparam("attempts"), last_error=bindparam("error"), claimed_by=None,
+                ), dead)
+            db.commit()
+
+            stats["sent"] += len(sent)
+            stats["retried"] += len(retry)
+            stats["failed"] += len(dead)
+
+    if any(stats.values()):
+        print(f"📤 Outbox drained: {stats}")
+    return stats
@@ -0,0 +1,71 @@
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+from sqlalchemy import select, update
+
+import models
+
+class PlannerCache:
+    """
+    1️⃣ Problem: The daily planner re-queries, re-scores and may call OpenAI on every screen open.
+    4️⃣ Core Logic: TTL + LRU map keyed by (user, day, that user's cache version). The version
+    lives on the user's row and every write the planner reads bumps it inside its own
+    transaction, so a write on any worker makes every worker's cached plan unreachable; stale
+    entries simply age out of the LRU while every other user's plan stays cached.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def key_for(self, user_id: str, version: Optional[int], *parts) -> tuple:
+        return (user_id, *parts, version)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        # A write that landed while this was computed bumped the version, so the key is never asked for again
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+planner_cache = PlannerCache(
+    max_entries=int(os.getenv("PLANNER_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("PLANNER_CACHE_TTL", "300")),
+)
+
+async def current_version(db, user_id: str) -> Optional[int]:
+    """The user's cache version (one primary-key read)."""
+    return await db.scalar(select(models.User.cache_version).where(models.User.id == user_id))
+
+async def bump_version(db, user_id: str) -> Optional[int]:
+    """
+    Call before committing any write to one of the user's tasks, reflections or busy blocks.
+    Runs in the caller's transaction, so the new version is visible exactly when the write is.
+    Returns the new version.
+    """
+    return await db.scalar(
+        update(models.User).where(models.User.id == user_id)
+        .values(cache_version=models.User.cache_version + 1)
+        .returning(models.User.cache_version)
+    )
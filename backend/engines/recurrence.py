@@ -0,0 +1,274 @@
+"""
+1️⃣ Problem: A habit was one row with one deadline, so a real routine meant creating a
+row per day, and every planner, voice and reminder query paid for all of them.
+
+4️⃣ Core Logic: a habit is a single series row carrying an RRULE-style rule; its deadline
+is the first occurrence. Occurrences are generated lazily, only for the window a caller
+asks about, and expanded windows are cached by (rule, start, days). An occurrence
+becomes a real row only when it is completed or edited. The row's id is the virtual
+id ("<series id>@<YYYYMMDDTHHMMSS>") and it records the original time in occurrence_at,
+so the expander knows to skip it. Deleting an occurrence adds an EXDATE to the rule.
+
+Supported rule parts: FREQ=DAILY|WEEKLY|MONTHLY, INTERVAL, BYDAY (weekly), COUNT,
+UNTIL and EXDATE (comma-separated), e.g. "FREQ=WEEKLY;BYDAY=MO,WE,FR".
+"""
+import calendar
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, time, timedelta
+from types import SimpleNamespace
+from typing import FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+from sqlalchemy import select
+
+import models
+
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+STAMP = "%Y%m%dT%H%M%S"
+OCCURRENCE_SEPARATOR = "@"
+
+class Rule(NamedTuple):
+    freq: str
+    interval: int = 1
+    byday: Tuple[int, ...] = ()
+    count: Optional[int] = None
+    until: Optional[datetime] = None
+    exdates: FrozenSet[datetime] = frozenset()
+
+def _parse_stamp(value: str) -> datetime:
+    value = value.rstrip("Z")
+    return datetime.strptime(value, STAMP) if "T" in value else datetime.strptime(value, "%Y%m%d").replace(hour=23, minute=59, second=59)
+
+def parse_rule(text: str) -> Rule:
+    """Parses "FREQ=...;..." into a Rule. Raises ValueError on anything unsupported."""
+    parts = {}
+    for part in filter(None, (p.strip() for p in text.upper().split(";"))):
+        key, sep, value = part.partition("=")
+        if not sep or not value:
+            raise ValueError(f"malformed rule part {part!r}")
+        parts[key] = value
+
+    freq = parts.pop("FREQ", None)
+    if freq not in ("DAILY", "WEEKLY", "MONTHLY"):
+        raise ValueError("FREQ must be DAILY, WEEKLY or MONTHLY")
+    interval = int(parts.pop("INTERVAL", "1"))
+    if interval < 1:
+        raise ValueError("INTERVAL must be at least 1")
+    byday = ()
+    if "BYDAY" in parts:
+        if freq != "WEEKLY":
+            raise ValueError("BYDAY is only supported with FREQ=WEEKLY")
+        try:
+            byday = tuple(sorted({WEEKDAYS.index(d) for d in parts.pop("BYDAY").split(",")}))
+        except ValueError:
+            raise ValueError(f"BYDAY days must be among {','.join(WEEKDAYS)}")
+    count = int(parts.pop("COUNT")) if "COUNT" in parts else None
+    if count is not None and count < 1:
+        raise ValueError("COUNT must be at least 1")
+    until = _parse_stamp(parts.pop("UNTIL")) if "UNTIL" in parts else None
+    exdates = frozenset(_parse_stamp(d) for d in parts.pop("EXDATE").split(",")) if "EXDATE" in parts else frozenset()
+    if parts:
+        raise ValueError(f"unsupported rule parts: {', '.join(sorted(parts))}")
+    return Rule(freq, interval, byday, count, until, exdates)
+
+def add_exdate(text: str, at: datetime) -> str:
+    """The rule with one more excluded occurrence."""
+    parts = [p for p in text.split(";") if p and not p.upper().startswith("EXDATE=")]
+    exdates = sorted(parse_rule(text).exdates | {at})
+    return ";".join(parts + ["EXDATE=" + ",".join(d.strftime(STAMP) for d in exdates)])
+
+def _add_months(moment: datetime, months: int) -> Optional[datetime]:
+    """Same day of month `months` later, or None when that month is too short (RFC 5545 skips it)."""
+    month = moment.month - 1 + months
+    year, month = moment.year + month // 12, month % 12 + 1
+    if moment.day > calendar.monthrange(year, month)[1]:
+        return None
+    return moment.replace(year=year, month=month)
+
+def _candidates(rule: Rule, dtstart: datetime, skip: int = 0) -> Iterator[datetime]:
+    """Every time the rule's frequency produces, from the `skip`-th period on."""
+    period = skip
+    if rule.freq == "DAILY":
+        while True:
+            yield dtstart + timedelta(days=period * rule.interval)
+            period += 1
+    elif rule.freq == "WEEKLY":
+        monday = dtstart - timedelta(days=dtstart.weekday())
+        days = rule.byday or (dtstart.weekday(),)
+        while True:
+            week = monday + timedelta(weeks=period * rule.interval)
+            for weekday in days:
+                at = week + timedelta(days=weekday)
+                if at >= dtstart:
+                    yield at
+            period += 1
+    else:
+        while True:
+            at = _add_months(dtstart, period * rule.interval)
+            if at is not None:
+                yield at
+            period += 1
+
+def _periods_before(rule: Rule, dtstart: datetime, moment: datetime) -> int:
+    """Whole periods that end before `moment`; safe to jump over when the rule has no COUNT."""
+    if moment <= dtstart:
+        return 0
+    if rule.freq == "DAILY":
+        return max(0, (moment - dtstart).days // rule.interval - 1)
+    if rule.freq == "WEEKLY":
+        return max(0, (moment - dtstart).days // 7 // rule.interval - 1)
+    months = (moment.year - dtstart.year) * 12 + moment.month - dtstart.month
+    return max(0, months // rule.interval - 1)
+
+def occurrences(rule: Rule, dtstart: datetime, after: Optional[datetime] = None) -> Iterator[datetime]:
+    """
+    Lazily yields the rule's occurrences in order, honouring COUNT, UNTIL and EXDATE.
+    Without a COUNT, generation starts near `after` instead of at dtstart.
+    """
+    skip = _periods_before(rule, dtstart, after) if after and rule.count is None else 0
+    produced = 0
+    for at in _candidates(rule, dtstart, skip):
+        if rule.until and at > rule.until:
+            return
+        if rule.count is not None and produced >= rule.count:
+            return
+        produced += 1
+        if at not in rule.exdates:
+            yield at
+
+class ExpansionCache:
+    """Occurrence times per (rule, dtstart, first day, last day), LRU-bounded."""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[tuple]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value: tuple):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+expansion_cache = ExpansionCache(int(os.getenv("RECURRENCE_CACHE_SIZE", "4096")))
+
+def between(rule_text: str, dtstart: datetime, start: datetime, end: datetime) -> List[datetime]:
+    """
+    Occurrences in [start, end]. Whole days are expanded and cached, then trimmed to the window.
+    Occurrences fall on whole seconds, the resolution of occurrence ids and EXDATEs, even when
+    the series' deadline carries milliseconds (as toISOString() deadlines from the app do).
+    """
+    dtstart = dtstart.replace(microsecond=0)
+    first_day, last_day = start.date(), end.date()
+    key = (rule_text, dtstart, first_day, last_day)
+    cached = expansion_cache.get(key)
+    if cached is None:
+        day_start, day_end = datetime.combine(first_day, time.min), datetime.combine(last_day, time.max)
+        found = []
+        for at in occurrences(parse_rule(rule_text), dtstart, after=day_start):
+            if at > day_end:
+                break
+            if at >= day_start:
+                found.append(at)
+        cached = tuple(found)
+        expansion_cache.set(key, cached)
+    return [at for at in cached if start <= at <= end]
+
+def occurrence_id(series_id: str, at: datetime) -> str:
+    return f"{series_id}{OCCURRENCE_SEPARATOR}{at.strftime(STAMP)}"
+
+def parse_occurrence_id(task_id: str) -> Optional[Tuple[str, datetime]]:
+    """(series id, occurrence time) for a virtual occurrence id, else None."""
+    series_id, sep, stamp = task_id.rpartition(OCCURRENCE_SEPARATOR)
+    if not sep or not series_id:
+        return None
+    try:
+        return series_id, datetime.strptime(stamp, STAMP)
+    except ValueError:
+        return None
+
+def is_occurrence(series, at: datetime) -> bool:
+    if series.deadline is None:
+        return False
+    try:
+        return at in between(series.recurrence, series.deadline, at, at)
+    except ValueError:
+        return False
+
+def virtual_occurrence(series, at: datetime) -> SimpleNamespace:
+    """An unsaved occurrence with every Task attribute the read paths use."""
+    return SimpleNamespace(
+        id=occurrence_id(series.id, at),
+        user_id=series.user_id,
+        title=series.title,
+        description=series.description,
+        deadline=at,
+        priority=series.priority,
+        category=series.category,
+        completed=False,
+        completed_at=None,
+        created_at=series.created_at,
+        updated_at=series.updated_at,
+        estimated_minutes=series.estimated_minutes,
+        recurrence=None,
+        series_id=series.id,
+        occurrence_at=at,
+    )
+
+def materialize(series, at: datetime) -> models.Task:
+    """The row an occurrence becomes once it is completed or edited. Add it to the session yourself."""
+    occurrence = virtual_occurrence(series, at)
+    return models.Task(**{k: v for k, v in vars(occurrence).items() if k not in ("completed_at", "updated_at")})
+
+def open_series_query(user_id: str):
+    """The user's active habit series (served by the partial index on open series)."""
+    return select(models.Task).where(
+        models.Task.user_id == user_id,
+        models.Task.recurrence.isnot(None),
+        models.Task.completed == False,
+        models.Task.deadline.isnot(None)
+    )
+
+def materialized_query(series_ids: Iterable[str], start: datetime, end: datetime):
+    """Occurrences in the window that already have a row of their own."""
+    return select(models.Task.series_id, models.Task.occurrence_at).where(
+        models.Task.series_id.in_(list(series_ids)),
+        models.Task.occurrence_at >= start,
+        models.Task.occurrence_at <= end
+    )
+
+def expand(series_rows: Iterable, start: datetime, end: datetime,
+           materialized: Set[Tuple[str, datetime]]) -> List[SimpleNamespace]:
+    """Virtual occurrences of every series in [start, end], minus those that have a row."""
+    expanded = []
+    for series in series_rows:
+        try:
+            times = between(series.recurrence, series.deadline, start, end)
+        except ValueError:
+            continue  # Stored before validation existed; a broken rule shouldn't break the planner
+        expanded.extend(virtual_occurrence(series, at) for at in times if (series.id, at) not in materialized)
+    return expanded
+
+async def open_occurrences(db, user_id: str, start: datetime, end: datetime) -> List[SimpleNamespace]:
+    """The user's not-yet-materialized habit occurrences in [start, end] (async session)."""
+    series = (await db.scalars(open_series_query(user_id))).all()
+    if not series:
+        return []
+    done = set((await db.execute(materialized_query([s.id for s in series], start, end))).all())
+    return expand(series, start, end, done)
+
+def open_occurrences_sync(db, user_id: str, start: datetime, end: datetime) -> List[SimpleNamespace]:
+    """open_occurrences for the scheduler jobs' sync sessions."""
+    series = db.scalars(open_series_query(user_id)).all()
+    if not series:
+        return []
+    done = set(db.execute(materialized_query([s.id for s in series], start, end)).all())
+    return expand(series, start, end, done)
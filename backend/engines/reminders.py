@@ -1,37 +1,131 @@
 import os
-from twilio.rest import Client
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time
+from typing import Callable, Iterable, Optional
+from sqlalchemy import select
 from database import SessionLocal
+from engines.call_scripts import LISTED_TASKS, render_start
+from engines.notifier import drain_outbox, enqueue
+from engines.recurrence import open_occurrences_sync
 import models
 
-# Use environment variables for security!
-ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
-AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
-TWILIO_NUMBER = os.getenv("TWILIO_NUMBER")
-USER_PHONE = os.getenv("MY_PHONE_NUMBER")
-
-client = Client(ACCOUNT_SID, AUTH_TOKEN)
-
-def send_pending_task_reminder():
-    db = SessionLocal()
-    try:
-        # Find tasks that are not 'done'
-        pending_tasks = db.query(models.Task).filter(models.Task.status != "done").all()
-        
-        if not pending_tasks:
-            return
-
-        task_list = "\n- ".join([t.title for t in pending_tasks])
-        message_body = (
-            f"Hey Vedant! Just a reminder that you have pending tasks:\n"
-            f"- {task_list}\n\n"
-            f"If done, please update it on the app! 🚀"
-        )
-
-        client.messages.create(
-            body=message_body,
-            from_=TWILIO_NUMBER,
-            to=USER_PHONE
-        )
-        print("Reminder sent via Twilio")
-    finally:
-        db.close()
\ No newline at end of file
+# An SMS body tops out at 1600 chars, so list a handful of titles and count the rest
+MAX_LISTED_TASKS = int(os.getenv("REMINDER_MAX_LISTED", "10"))
+STREAM_WINDOW = 500
+# Users are split into this many shards, each worked through on its own thread and session
+REMINDER_SHARDS = int(os.getenv("REMINDER_SHARDS", "4"))
+
+def _for_each_user(fn: Callable, user_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    Runs fn(db, user) for every user with a phone number, shards in parallel.
+    Each user commits on their own, so one failure doesn't cost anyone else
+    their reminder. Returns how many calls returned something truthy.
+    """
+    query = select(models.User.id, models.User.name, models.User.phone_number).where(
+        models.User.phone_number.isnot(None)
+    )
+    if user_ids is not None:
+        query = query.where(models.User.id.in_(list(user_ids)))
+    with SessionLocal() as db:
+        users = db.execute(query.order_by(models.User.id)).all()
+
+    def run(shard) -> int:
+        done = 0
+        with SessionLocal() as db:
+            for user in shard:
+                try:
+                    done += bool(fn(db, user))
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    print(f"⚠️ Reminder job failed for user {user.id}: {e}")
+        return done
+
+    shards = [shard for shard in (users[i::REMINDER_SHARDS] for i in range(REMINDER_SHARDS)) if shard]
+    if len(shards) <= 1:
+        return sum(run(shard) for shard in shards)
+    with ThreadPoolExecutor(max_workers=len(shards), thread_name_prefix="reminders") as pool:
+        return sum(pool.map(run, shards))
+
+def _todays_habits(db, user_id: str) -> list:
+    """The user's habit occurrences still due today, soonest first; nothing past midnight is expanded."""
+    now = datetime.utcnow()
+    occurrences = open_occurrences_sync(db, user_id, now, datetime.combine(now.date(), time.max))
+    return sorted(occurrences, key=lambda o: o.deadline)
+
+def _queue_reminder(db, user) -> bool:
+    # Today's habits lead the list, then the user's open tasks, streamed in windows instead of loaded at once
+    habits = [o.title for o in _todays_habits(db, user.id)]
+    pending = db.scalars(
+        models.Task.__table__.select()
+        .with_only_columns(models.Task.title)
+        .where(models.Task.user_id == user.id, models.Task.completed == False, models.Task.recurrence.is_(None))
+        .order_by(models.Task.deadline)
+        .execution_options(yield_per=STREAM_WINDOW)
+    )
+    titles, total = habits[:MAX_LISTED_TASKS], len(habits)
+    for title in pending:
+        total += 1
+        if len(titles) < MAX_LISTED_TASKS:
+            titles.append(title)
+    pending.close()
+
+    if not total:
+        return False
+
+    task_list = "\n- ".join(titles)
+    more = f"\n...and {total - len(titles)} more" if total > len(titles) else ""
+    message_body = (
+        f"Hey {user.name}! Just a reminder that you have pending tasks:\n"
+        f"- {task_list}{more}\n\n"
+        f"If done, please update it on the app! 🚀"
+    )
+
+    # One reminder per user per 6-hour slot, however many times the job fires
+    now = datetime.utcnow()
+    key = f"reminder:{user.id}:{now:%Y-%m-%d}:{now.hour // 6}"
+    return enqueue(db, "sms", user.phone_number, key, body=message_body)
+
+def send_pending_task_reminder(user_ids: Optional[Iterable[str]] = None):
+    """Queues each user's pending-task SMS in the outbox; the notifier delivers them."""
+    queued = _for_each_user(_queue_reminder, user_ids)
+    if queued:
+        print(f"{queued} reminder(s) queued in the outbox")
+
+def trigger_evening_call(key: str = None, user_ids: Optional[Iterable[str]] = None):
+    """
+    Fires at the scheduled time to call each user (queued in the outbox, then delivered).
+    Only the calls queued here are sent right away; anything else due stays with the drain job.
+    """
+    # NGROK_URL is required because Twilio needs a public URL to reach your localhost
+    ngrok_url = os.getenv("NGROK_URL")
+
+    # One call per user per 5-minute slot, even if the job fires twice
+    now = datetime.utcnow()
+    slot = key or f"evening-call:{now:%Y-%m-%d %H}:{now.minute // 5}"
+    queued_ids = []
+
+    def queue_call(db, user) -> bool:
+        # Render the script now, so the webhook has nothing to query while the phone rings
+        upcoming = db.execute(select(models.Task.title, models.Task.deadline).where(
+            models.Task.user_id == user.id,
+            models.Task.completed == False,
+            models.Task.recurrence.is_(None)
+        ).order_by(models.Task.deadline).limit(LISTED_TASKS)).all()
+        # Tonight's still-open habits compete for the same few slots by deadline
+        upcoming = sorted([*upcoming, *_todays_habits(db, user.id)], key=lambda t: t.deadline or datetime.max)
+        titles = [t.title for t in upcoming[:LISTED_TASKS]]
+        # ?user= and ?script= tell the voice webhooks whose call it is and where its script is stored
+        outbox_id = str(uuid.uuid4())
+        added = enqueue(db, "call", user.phone_number, f"{slot}:{user.id}",
+                        url=f"{ngrok_url}/api/voice/start?user={user.id}&script={outbox_id}",
+                        twiml=render_start(user.id, titles), outbox_id=outbox_id)
+        if added:
+            queued_ids.append(outbox_id)
+        return added
+
+    queued = _for_each_user(queue_call, user_ids)
+    if queued:
+        print(f"📞 {queued} evening call(s) queued")
+    drain_outbox(only=queued_ids)
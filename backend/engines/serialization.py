@@ -0,0 +1,84 @@
+"""
+1️⃣ Problem: Task-heavy endpoints loaded full ORM objects, ran TaskResponse.model_validate
+on each one, and then FastAPI validated the response_model all over again before
+encoding. On a few thousand tasks that Pydantic work is most of the request.
+
+4️⃣ Core Logic: select only the columns TaskResponse exposes, as plain row tuples, turn
+them into dicts in one pass and encode with orjson. Routes keep their response_model,
+so the OpenAPI schema and the JSON are unchanged, but return a ready Response, which
+FastAPI sends untouched. Large bodies are brotli- or gzip-compressed for clients that
+opt in through Accept-Encoding.
+"""
+import gzip
+import json
+import os
+from collections import namedtuple
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+import models, schemas
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this go out as-is; 0 turns compression off
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "16384"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# TaskResponse's fields in declaration order, so keys come out where Pydantic put them
+TASK_FIELDS = tuple(schemas.TaskResponse.model_fields)
+TASK_COLUMNS = tuple(getattr(models.Task, name) for name in TASK_FIELDS if name != "priority_score")
+# Same shape and attribute access as a row selected with TASK_COLUMNS
+TaskRow = namedtuple("TaskRow", [column.key for column in TASK_COLUMNS])
+
+def task_dict(row, priority_score: float = 0.0) -> dict:
+    """A row selected with TASK_COLUMNS, shaped like TaskResponse."""
+    data = dict(zip(TASK_FIELDS, row))
+    data["priority_score"] = priority_score
+    return data
+
+def task_row(task) -> TaskRow:
+    """An object with Task's attributes (say, a habit occurrence) as a TASK_COLUMNS row."""
+    return TaskRow(*(getattr(task, name) for name in TaskRow._fields))
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    """orjson when installed (datetimes natively, naive ones stay naive like Pydantic's), else stdlib json."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode()
+
+def _accepted_encodings(request: Request) -> set:
+    header = request.headers.get("accept-encoding", "")
+    return {part.split(";")[0].strip().lower() for part in header.split(",")}
+
+def json_response(request: Request, content: Any = None, body: Optional[bytes] = None,
+                  headers: Optional[Dict[str, str]] = None, status_code: int = 200) -> Response:
+    """Encodes content (or sends an already-encoded body), compressing it when large enough and accepted."""
+    body = dumps(content) if body is None else body
+    headers = dict(headers or {})
+    if COMPRESS_MIN_BYTES and len(body) >= COMPRESS_MIN_BYTES:
+        accepted = _accepted_encodings(request)
+        if brotli is not None and "br" in accepted:
+            body = brotli.compress(body, quality=BROTLI_QUALITY)
+            headers["Content-Encoding"] = "br"
+        elif "gzip" in accepted:
+            body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+            headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
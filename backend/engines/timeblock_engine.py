@@ -0,0 +1,239 @@
+import bisect
+import os
+import time as clock
+from collections import OrderedDict
+from datetime import datetime, timedelta, time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_MINUTES = 30
+
+class _GapTree:
+    """Max segment tree over free-gap lengths; finds the earliest gap that fits in O(log n)."""
+
+    def __init__(self, lengths: Sequence[int]):
+        self.size = 1
+        while self.size < max(1, len(lengths)):
+            self.size *= 2
+        self.tree = [0] * (2 * self.size)
+        self.tree[self.size:self.size + len(lengths)] = lengths
+        for i in range(self.size - 1, 0, -1):
+            self.tree[i] = max(self.tree[2 * i], self.tree[2 * i + 1])
+
+    def update(self, index: int, length: int):
+        i = index + self.size
+        self.tree[i] = length
+        i //= 2
+        while i:
+            self.tree[i] = max(self.tree[2 * i], self.tree[2 * i + 1])
+            i //= 2
+
+    def first_fit(self, length: int) -> Optional[int]:
+        if self.tree[1] < length:
+            return None
+        i = 1
+        while i < self.size:
+            i = 2 * i if self.tree[2 * i] >= length else 2 * i + 1
+        return i - self.size
+
+class Timeline:
+    """
+    1️⃣ Problem: A ranked list doesn't tell the user *when* to do anything.
+    4️⃣ Core Logic: First-fit packing into free working-hour gaps, earliest slot first.
+    Times are kept as integer minutes from the window start; each placement carves
+    from the front of a gap, so the gap list stays sorted and only shrinks.
+    """
+
+    def __init__(self, start: datetime, end: datetime, gaps: List[List[int]]):
+        self.start = start
+        self.end = end
+        self.gaps = gaps
+        self.tree = _GapTree([e - s for s, e in gaps])
+        self.blocks: Dict[str, Tuple[int, int, str]] = {}
+        self.unscheduled: Dict[str, str] = {}
+
+    def _minutes(self, moment: datetime) -> int:
+        return int((moment - self.start).total_seconds() // 60)
+
+    def covers(self, deadline: Optional[datetime]) -> bool:
+        return deadline is not None and self.start <= deadline <= self.end
+
+    def place(self, task_id: str, title: str, minutes: Optional[int], deadline: datetime) -> bool:
+        """Books the earliest free slot that finishes by the deadline."""
+        minutes = minutes or DEFAULT_MINUTES
+        i = self.tree.first_fit(minutes)
+        # Gaps are sorted, so if the first fitting gap misses the deadline every later one does too
+        if i is None or self.gaps[i][0] + minutes > self._minutes(deadline):
+            self.unscheduled[task_id] = title
+            return False
+
+        begin = self.gaps[i][0]
+        self.gaps[i][0] += minutes
+        self.tree.update(i, self.gaps[i][1] - self.gaps[i][0])
+        self.blocks[task_id] = (begin, begin + minutes, title)
+        return True
+
+    def remove(self, task_id: str):
+        """Frees a task's slot, merging it back into the neighbouring gaps."""
+        self.unscheduled.pop(task_id, None)
+        block = self.blocks.pop(task_id, None)
+        if not block:
+            return
+
+        begin, finish, _ = block
+        i = bisect.bisect_left(self.gaps, [finish])
+        joins_next = i < len(self.gaps) and self.gaps[i][0] == finish
+        joins_prev = i > 0 and self.gaps[i - 1][1] == begin
+
+        if joins_next and not joins_prev:
+            self.gaps[i][0] = begin
+            self.tree.update(i, self.gaps[i][1] - begin)
+            return
+        if joins_prev and not joins_next:
+            self.gaps[i - 1][1] = finish
+            self.tree.update(i - 1, finish - self.gaps[i - 1][0])
+            return
+
+        # The freed slot bridges two gaps or sits between two blocks: the gap count changes
+        if joins_prev and joins_next:
+            self.gaps[i - 1][1] = self.gaps[i][1]
+            del self.gaps[i]
+        else:
+            self.gaps.insert(i, [begin, finish])
+        self.tree = _GapTree([e - s for s, e in self.gaps])
+
+    def advance(self, moment: datetime):
+        """Drops free time before `moment`, so a timeline built earlier never books the past."""
+        cutoff = self._minutes(moment)
+        if not self.gaps or self.gaps[0][0] >= cutoff:
+            return
+        for gap in self.gaps:
+            if gap[0] >= cutoff:
+                break
+            gap[0] = min(cutoff, gap[1])
+        self.gaps = [gap for gap in self.gaps if gap[1] > gap[0]]
+        self.tree = _GapTree([e - s for s, e in self.gaps])
+
+    def upsert(self, task) -> bool:
+        """Re-packs a single edited task without touching anyone else's slot."""
+        self.remove(task.id)
+        self.advance(datetime.utcnow())
+        # A habit series never takes a slot itself; its occurrences do
+        if task.completed or getattr(task, "recurrence", None) or not self.covers(task.deadline):
+            return False
+        return self.place(task.id, task.title, task.estimated_minutes, task.deadline)
+
+    def to_blocks(self) -> List[dict]:
+        return [{
+            "task_id": task_id,
+            "title": title,
+            "start": self.start + timedelta(minutes=begin),
+            "end": self.start + timedelta(minutes=finish),
+        } for task_id, (begin, finish, title) in sorted(self.blocks.items(), key=lambda kv: kv[1][0])]
+
+def free_gaps(
+    start: datetime,
+    days: int,
+    work_start: time,
+    work_end: time,
+    busy: Sequence[Tuple[datetime, datetime]],
+) -> List[List[int]]:
+    """Working hours for each day minus busy blocks, as [start, end) minute offsets from `start`."""
+    busy = sorted(busy)
+    gaps, b = [], 0
+    for offset in range(days):
+        day = start.date() + timedelta(days=offset)
+        cursor = max(start, datetime.combine(day, work_start))
+        day_end = datetime.combine(day, work_end)
+
+        # Skip busy blocks that ended before this point in the day
+        while b < len(busy) and busy[b][1] <= cursor:
+            b += 1
+        j = b
+        while cursor < day_end and j < len(busy) and busy[j][0] < day_end:
+            if busy[j][0] > cursor:
+                gaps.append([cursor, busy[j][0]])
+            cursor = max(cursor, busy[j][1])
+            j += 1
+        if cursor < day_end:
+            gaps.append([cursor, day_end])
+
+    to_min = lambda moment: int((moment - start).total_seconds() // 60)
+    return [[to_min(s), to_min(e)] for s, e in gaps]
+
+def build_timeline(
+    ranked_tasks: Sequence,
+    start: datetime,
+    days: int = 7,
+    work_start: time = time(9, 0),
+    work_end: time = time(18, 0),
+    busy: Sequence[Tuple[datetime, datetime]] = (),
+) -> Timeline:
+    """Packs tasks (already sorted by priority score) into the working hours of the next `days` days."""
+    end = datetime.combine(start.date() + timedelta(days=days), time.min)
+    timeline = Timeline(start, end, free_gaps(start, days, work_start, work_end, busy))
+    for task in ranked_tasks:
+        if timeline.covers(task.deadline):
+            timeline.place(task.id, task.title, task.estimated_minutes, task.deadline)
+    return timeline
+
+class TimelineStore:
+    """
+    Keeps each user's last built timeline so task writes can patch it instead of
+    rebuilding the week. The least recently used users' timelines are dropped.
+
+    Entries carry the user's cache version (see planner_cache) from when they were built.
+    A write on this worker patches the timeline and moves it to the write's version; a write
+    anywhere else leaves it behind, so the next read rebuilds. Entries older than the TTL
+    are rebuilt too, which keeps the window's start close to now.
+    """
+
+    def __init__(self, max_users: int = 1024, ttl_seconds: float = 600):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        # user -> [key, version, built at, timeline]
+        self.entries: "OrderedDict[str, list]" = OrderedDict()
+
+    def get(self, user_id: str, key, version: Optional[int]) -> Optional[Timeline]:
+        entry = self.entries.get(user_id)
+        if entry is None or entry[0] != key or entry[1] != version:
+            return None
+        if clock.monotonic() - entry[2] > self.ttl_seconds:
+            del self.entries[user_id]
+            return None
+        self.entries.move_to_end(user_id)
+        return entry[3]
+
+    def put(self, user_id: str, key, version: Optional[int], timeline: Timeline):
+        self.entries[user_id] = [key, version, clock.monotonic(), timeline]
+        self.entries.move_to_end(user_id)
+        while len(self.entries) > self.max_users:
+            self.entries.popitem(last=False)
+
+    def _patchable(self, user_id: str, version: Optional[int]) -> Optional[list]:
+        """The entry, if it already holds every write but the one that produced `version`."""
+        entry = self.entries.get(user_id)
+        if entry is None:
+            return None
+        if version is None or entry[1] is None or entry[1] < version - 1:
+            del self.entries[user_id]
+            return None
+        entry[1] = max(entry[1], version)
+        return entry
+
+    def task_changed(self, task, version: Optional[int]):
+        entry = self._patchable(task.user_id, version)
+        if entry:
+            entry[3].upsert(task)
+
+    def task_removed(self, user_id: str, task_id: str, version: Optional[int]):
+        entry = self._patchable(user_id, version)
+        if entry:
+            entry[3].remove(task_id)
+
+    def invalidate(self, user_id: str):
+        self.entries.pop(user_id, None)
+
+timeline_store = TimelineStore(
+    int(os.getenv("TIMELINE_STORE_USERS", "1024")),
+    float(os.getenv("TIMELINE_STORE_TTL", "600")),
+)
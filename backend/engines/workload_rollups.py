@@ -0,0 +1,194 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+from sqlalchemy import Date, bindparam, case, cast, delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+
+# Cognitive load per open task, shared with the burnout engine
+PRIORITY_WEIGHTS = {"high": 15, "medium": 10, "low": 5}
+ROLLUP_COLUMNS = ("user_id", "day", "high_count", "medium_count", "low_count", "weighted_score", "total_minutes")
+COMPLETION_KEY = ("user_id", "period", "period_start", "priority", "category")
+COMPLETION_COLUMNS = COMPLETION_KEY + ("completed_count", "total_minutes")
+STREAM_WINDOW = 5000
+
+class TaskLoad(NamedTuple):
+    """The fields of a task that feed its owner's workload and completion rollups."""
+    user_id: str
+    deadline: Optional[datetime]
+    priority: Optional[str]
+    completed: bool
+    estimated_minutes: int
+    category: Optional[str] = "task"
+    completed_at: Optional[datetime] = None
+    # A habit series is a template, not a task: only its materialized occurrences are counted
+    recurrence: Optional[str] = None
+
+def task_load(task) -> TaskLoad:
+    """Snapshot a task (ORM row or schema) before and after a write."""
+    return TaskLoad(
+        user_id=getattr(task, "user_id", None) or models.DEFAULT_USER_ID,
+        deadline=task.deadline,
+        priority=task.priority or "medium",
+        completed=bool(task.completed),
+        estimated_minutes=task.estimated_minutes or 0,
+        category=getattr(task, "category", None) or "task",
+        completed_at=getattr(task, "completed_at", None),
+        recurrence=getattr(task, "recurrence", None),
+    )
+
+def week_start(day: date) -> date:
+    """The Monday of day's week; weekly rollups are keyed by it."""
+    return day - timedelta(days=day.weekday())
+
+def _counts(load: Optional[TaskLoad], sign: int) -> Optional[dict]:
+    if load is None or load.completed or load.deadline is None or load.recurrence:
+        return None
+    return {
+        "user_id": load.user_id,
+        "day": load.deadline.date(),
+        "high_count": sign * (load.priority == "high"),
+        "medium_count": sign * (load.priority == "medium"),
+        "low_count": sign * (load.priority == "low"),
+        "weighted_score": sign * PRIORITY_WEIGHTS.get(load.priority, 0),
+        "total_minutes": sign * load.estimated_minutes,
+    }
+
+def _completions(load: Optional[TaskLoad], sign: int) -> list:
+    """A finished task's contribution to its completion day and week."""
+    if load is None or not load.completed or load.completed_at is None or load.recurrence:
+        return []
+    day = load.completed_at.date()
+    return [{
+        "user_id": load.user_id, "period": period, "period_start": start,
+        "priority": load.priority, "category": load.category,
+        "completed_count": sign, "total_minutes": sign * load.estimated_minutes,
+    } for period, start in (("day", day), ("week", week_start(day)))]
+
+def _upsert_completions(dialect: str, values: dict):
+    insert_fn = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert_fn(models.CompletionRollup).values(**values)
+    table = models.CompletionRollup.__table__
+    return stmt.on_conflict_do_update(
+        index_elements=list(COMPLETION_KEY),
+        set_={col: table.c[col] + stmt.excluded[col] for col in COMPLETION_COLUMNS[len(COMPLETION_KEY):]},
+    )
+
+def _upsert(dialect: str, values: dict):
+    """INSERT the delta, or add it onto the existing day row, in one atomic statement."""
+    insert_fn = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert_fn(models.DailyWorkload).values(**values)
+    table = models.DailyWorkload.__table__
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id", "day"],
+        set_={col: table.c[col] + stmt.excluded[col] for col in ROLLUP_COLUMNS[2:]},
+    )
+
+async def apply_task_delta(db: AsyncSession, before: Optional[TaskLoad], after: Optional[TaskLoad]):
+    """
+    Moves a task's contribution from its old day to its new one.
+    Runs on the caller's session so it commits (or rolls back) with the task write.
+    """
+    await apply_task_deltas(db, [(before, after)])
+
+async def apply_task_deltas(db: AsyncSession, changes: Iterable[Tuple[Optional[TaskLoad], Optional[TaskLoad]]]):
+    """
+    Folds many (before, after) pairs into one upsert per affected (user, day), and one
+    per affected completion bucket, each sent as a single executemany.
+    """
+    per_day: Dict[Tuple[str, date], dict] = {}
+    per_bucket: Dict[tuple, dict] = {}
+    for before, after in changes:
+        if before == after:
+            continue
+        for values in _completions(before, -1) + _completions(after, +1):
+            key = tuple(values[col] for col in COMPLETION_KEY)
+            totals = per_bucket.setdefault(key, {**values, "completed_count": 0, "total_minutes": 0})
+            totals["completed_count"] += values["completed_count"]
+            totals["total_minutes"] += values["total_minutes"]
+        for values in (_counts(before, -1), _counts(after, +1)):
+            if not values:
+                continue
+            totals = per_day.setdefault((values["user_id"], values["day"]), {
+                "user_id": values["user_id"], "day": values["day"], **dict.fromkeys(ROLLUP_COLUMNS[2:], 0),
+            })
+            for col in ROLLUP_COLUMNS[2:]:
+                totals[col] += values[col]
+
+    if per_day:
+        stmt = _upsert(db.bind.dialect.name, {col: bindparam(col) for col in ROLLUP_COLUMNS})
+        await db.execute(stmt, list(per_day.values()))
+    if per_bucket:
+        stmt = _upsert_completions(db.bind.dialect.name, {col: bindparam(col) for col in COMPLETION_COLUMNS})
+        await db.execute(stmt, list(per_bucket.values()))
+
+async def workload_between(db: AsyncSession, user_id: str, first_day: date, last_day: date) -> list:
+    """One user's rollup rows for an inclusive day range: one row per day at most, never a task scan."""
+    return (await db.scalars(select(models.DailyWorkload).where(
+        models.DailyWorkload.user_id == user_id,
+        models.DailyWorkload.day >= first_day,
+        models.DailyWorkload.day <= last_day
+    ).order_by(models.DailyWorkload.day))).all()
+
+def rebuild_workload_rollups(conn):
+    """Recomputes every rollup from the tasks table (initial backfill, or repair)."""
+    Task = models.Task
+    day = func.date(Task.deadline) if conn.dialect.name == "sqlite" else cast(Task.deadline, Date)
+    weight = case(
+        *((Task.priority == p, w) for p, w in PRIORITY_WEIGHTS.items()), else_=0
+    )
+    per_day = select(
+        Task.user_id,
+        day,
+        func.sum(case((Task.priority == "high", 1), else_=0)),
+        func.sum(case((Task.priority == "medium", 1), else_=0)),
+        func.sum(case((Task.priority == "low", 1), else_=0)),
+        func.sum(weight),
+        func.sum(func.coalesce(Task.estimated_minutes, 0)),
+    ).where(
+        Task.completed == False,
+        Task.deadline.isnot(None),
+        Task.recurrence.is_(None)
+    ).group_by(Task.user_id, day)
+
+    conn.execute(delete(models.DailyWorkload))
+    conn.execute(insert(models.DailyWorkload).from_select(list(ROLLUP_COLUMNS), per_day))
+
+async def completions_between(db: AsyncSession, user_id: str, period: str, first: date, last: date) -> list:
+    """One user's completion buckets for an inclusive range of days or week starts."""
+    rollup = models.CompletionRollup
+    return (await db.scalars(select(rollup).where(
+        rollup.user_id == user_id,
+        rollup.period == period,
+        rollup.period_start >= first,
+        rollup.period_start <= last
+    ).order_by(rollup.period_start))).all()
+
+def rebuild_completion_rollups(conn):
+    """
+    Recomputes every completion bucket from live and archived tasks (initial
+    backfill, or repair). Streams the rows and sums in Python, so the day and
+    week bucketing is the same code the write path uses on either dialect.
+    """
+    live, archived = models.Task, models.ArchivedTask
+    columns = ("user_id", "completed_at", "priority", "category", "estimated_minutes")
+    sources = (
+        select(*(live.__table__.c[c] for c in columns)).where(live.completed == True, live.recurrence.is_(None)),
+        select(*(archived.__table__.c[c] for c in columns)),
+    )
+
+    totals: Dict[tuple, dict] = {}
+    for query in sources:
+        rows = conn.execute(query.execution_options(yield_per=STREAM_WINDOW))
+        for user_id, completed_at, priority, category, minutes in rows:
+            load = TaskLoad(user_id, None, priority or "medium", True, minutes or 0, category or "task", completed_at)
+            for values in _completions(load, +1):
+                key = tuple(values[col] for col in COMPLETION_KEY)
+                bucket = totals.setdefault(key, {**values, "completed_count": 0, "total_minutes": 0})
+                bucket["completed_count"] += 1
+                bucket["total_minutes"] += values["total_minutes"]
+
+    conn.execute(delete(models.CompletionRollup))
+    if totals:
+        conn.execute(insert(models.CompletionRollup), list(totals.values()))
@@ -1,23 +1,23 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base
-from routers import tasks, planner, capture, voice
+from fastapi.responses import PlainTextResponse
 import os
-from twilio.rest import Client
-from apscheduler.schedulers.background import BackgroundScheduler
-from engines.reminders import send_pending_task_reminder
+from clients import close_clients
+from database import get_current_user_id
+from routers import tasks, planner, capture, voice, events, users, insights
+from datetime import datetime
+from engines import metrics
+from engines.job_scheduler import job_scheduler
+from engines.reminders import trigger_evening_call
 
-# 1. Create database tables
-Base.metadata.create_all(bind=engine)
-
-# 2. Initialize the App ONCE
+# 1. Initialize the App ONCE
 app = FastAPI(
     title="FocusFlow AI System",
     description="Intelligent Life Management System Backend",
     version="1.0.0"
 )
 
-# 3. CORS Configuration
+# 2. CORS Configuration
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], 
@@ -26,43 +26,55 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 4. Register Routers
+# Outermost, so the timing covers CORS and every other middleware
+if metrics.ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# 3. Register Routers
 app.include_router(capture.router)
 app.include_router(tasks.router)
 app.include_router(planner.router)
 app.include_router(voice.router)
+app.include_router(events.router)
+app.include_router(users.router)
+app.include_router(insights.router)
 
-# --- TWILIO & SCHEDULER LOGIC ---
-scheduler = BackgroundScheduler()
-
-def trigger_evening_call():
-    """Fires at the scheduled time to call the user."""
-    client = Client(os.getenv("TWILIO_ACCOUNT_SID"), os.getenv("TWILIO_AUTH_TOKEN"))
-    
-    # NGROK_URL is required because Twilio needs a public URL to reach your localhost
-    ngrok_url = os.getenv("NGROK_URL") 
-    my_phone = os.getenv("MY_PHONE_NUMBER")
-    
-    call = client.calls.create(
-        to=my_phone,
-        from_=os.getenv("TWILIO_PHONE_NUMBER"),
-        url=f"{ngrok_url}/api/voice/start",
-        method="POST"
-    )
-    print(f"📞 Evening call dispatched! SID: {call.sid}")
+# 4. Schema setup: `python migrate.py` in deployments; dev servers do it on startup
+@app.on_event("startup")
+def run_migrations():
+    if os.getenv("AUTO_MIGRATE", "1") == "1":
+        from migrate import migrate
+        migrate()
 
+# --- TWILIO & SCHEDULER LOGIC ---
+# One scheduler per process, but only the worker holding the leader lease runs jobs
 @app.on_event("startup")
 def start_scheduler():
-    # For Hackathon Demo: Set this to trigger every 5 minutes so judges can see it!
-    # In production: trigger='cron', hour=21, minute=0
-    scheduler.add_job(trigger_evening_call, 'interval', minutes=5) 
-    scheduler.start()
+    job_scheduler.start()
+
+@app.on_event("shutdown")
+def stop_scheduler():
+    job_scheduler.shutdown()
+
+@app.on_event("shutdown")
+async def release_clients():
+    await close_clients()
+
+@app.get("/api/scheduler/status")
+def scheduler_status():
+    """Leader state, next run times and per-job latency/misfire counters for this worker."""
+    return job_scheduler.status()
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Route latency histograms, in-flight requests and engine stage spans, for Prometheus to scrape."""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
 
 # --- NEW SECRET TEST ENDPOINT ---
 @app.get("/api/test-call")
-def test_call_now():
+def test_call_now(user_id: str = Depends(get_current_user_id)):
     """Secret endpoint to manually trigger the Twilio call for the hackathon demo!"""
-    trigger_evening_call()
+    trigger_evening_call(key=f"test-call:{datetime.utcnow().isoformat()}", user_ids=[user_id])
     return {"status": "success", "message": "Check your phone, it should be ringing!"}
 
 # 5. Global Routes
@@ -74,18 +86,3 @@ def health_check():
 async def smart_capture():
     print("HIT FASTAPI ENDPOINT")
     return {"status": "ok"}
-
-# Initialize Scheduler
-scheduler = BackgroundScheduler()
-
-# Schedule to run every 6 hours (or use CronTrigger for specific times)
-scheduler.add_job(send_pending_task_reminder, 'interval', hours=6)
-
-@app.on_event("startup")
-def start_scheduler():
-    if not scheduler.running:
-        scheduler.start()
-
-@app.on_event("shutdown")
-def stop_scheduler():
-    scheduler.shutdown()
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""
+Schema setup, kept out of the import path.
+
+    python migrate.py
+    python migrate.py --rebuild-rollups
+
+Creates missing tables, columns and indexes, makes sure the default user exists,
+then backfills any rollup table that was just created. Deployments run this once before starting workers; in
+development main.py runs it at startup unless AUTO_MIGRATE=0. --rebuild-rollups
+recomputes the workload and completion rollups from the tasks, repairing any drift.
+"""
+import argparse
+import os
+from sqlalchemy import select
+
+from database import engine, init_db
+from engines.workload_rollups import rebuild_completion_rollups, rebuild_workload_rollups
+import models
+
+def migrate(rebuild_rollups: bool = False) -> set:
+    """
+    Brings the database up to the current models. Returns the newly created tables.
+    rebuild_rollups recomputes both rollup tables even when they already existed.
+    """
+    created = init_db()
+    with engine.begin() as conn:
+        # Owner of pre-account rows and of requests without X-User-Id
+        if conn.scalar(select(models.User.id).where(models.User.id == models.DEFAULT_USER_ID)) is None:
+            conn.execute(models.User.__table__.insert().values(
+                id=models.DEFAULT_USER_ID,
+                name=os.getenv("USER_NAME", "Vedant"),
+                phone_number=os.getenv("MY_PHONE_NUMBER"),
+            ))
+    if rebuild_rollups or "daily_workload" in created:
+        with engine.begin() as conn:
+            rebuild_workload_rollups(conn)
+    if rebuild_rollups or "completion_rollups" in created:
+        with engine.begin() as conn:
+            rebuild_completion_rollups(conn)
+    return created
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rebuild-rollups", action="store_true",
+                        help="recompute daily_workload and completion_rollups from the tasks")
+    args = parser.parse_args()
+    created = migrate(rebuild_rollups=args.rebuild_rollups)
+    if args.rebuild_rollups:
+        print("Rollups rebuilt from tasks")
+    print(f"Created tables: {', '.join(sorted(created))}" if created else "Schema up to date")
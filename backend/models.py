@@ -1,27 +1,207 @@
-from sqlalchemy import Column, String, Boolean, DateTime, Float, Integer
+from sqlalchemy import Column, String, Boolean, Date, DateTime, Float, ForeignKey, Integer, Index, text
 from database import Base
 import uuid
 from datetime import datetime
 
+# Owner of every row written before accounts existed, and of requests that don't say who they're for
+DEFAULT_USER_ID = "default"
+
+class User(Base):
+    """One person using the app. Every task, reflection and busy block belongs to one."""
+    __tablename__ = "users"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    name = Column(String, nullable=False)
+    # Reminders and calls go here; voice webhooks map the dialled number back to the user
+    phone_number = Column(String, nullable=True, unique=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # Bumped in the same transaction as any write the planner reads, so every worker's
+    # cached plan for this user goes stale together
+    cache_version = Column(Integer, nullable=False, default=0)
+
 class Task(Base):
     __tablename__ = "tasks"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, default=DEFAULT_USER_ID)
     title = Column(String, index=True)
     description = Column(String, nullable=True)
     deadline = Column(DateTime, nullable=True)
     priority = Column(String, default="medium") # high, medium, low
     category = Column(String, default="task")   # task, assignment, habit
     completed = Column(Boolean, default=False)
+    # Set when completed flips to true, cleared when it flips back; Insights buckets by this day
+    completed_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Bumped on every write so clients can pull deltas with ?updated_since=
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Store calculated metrics (optional, can also be strictly calculated at runtime)
     estimated_minutes = Column(Integer, default=30)
 
+    # A habit series carries an RRULE-style rule (engines/recurrence) and its deadline is the
+    # first occurrence; occurrences only get a row of their own once completed or edited
+    recurrence = Column(String, nullable=True)
+    series_id = Column(String, nullable=True)
+    occurrence_at = Column(DateTime, nullable=True)
+
+    # Every query is scoped to one user, so user_id leads each index
+    __table_args__ = (
+        # Keyset pagination walks (created_at, id) in order
+        Index("ix_tasks_user_created_at_id", "user_id", "created_at", "id"),
+        # Delta sync and the ETag's MAX(updated_at)
+        Index("ix_tasks_user_updated_at", "user_id", "updated_at"),
+        # Planner (deadline window), voice (LIMIT 3) and reminders only ever read open tasks
+        Index(
+            "ix_tasks_user_open_deadline", "user_id", "deadline",
+            sqlite_where=text("completed = 0"), postgresql_where=text("completed = false"),
+        ),
+        # The archiver sweeps every user's finished tasks past the cutoff
+        Index(
+            "ix_tasks_done_completed_at", "completed_at",
+            sqlite_where=text("completed = 1"), postgresql_where=text("completed = true"),
+        ),
+        # Planner, voice and reminders load the user's open series before expanding them
+        Index(
+            "ix_tasks_user_open_series", "user_id",
+            sqlite_where=text("recurrence IS NOT NULL AND completed = 0"),
+            postgresql_where=text("recurrence IS NOT NULL AND completed = false"),
+        ),
+        # One row per occurrence, however many clients complete it at once
+        Index("ix_tasks_series_occurrence", "series_id", "occurrence_at", unique=True),
+    )
+
+class ArchivedTask(Base):
+    """
+    Completed tasks moved out of `tasks` once they pass the archive cutoff, so the
+    live table and its indexes only hold what the app still works with.
+    """
+    __tablename__ = "archived_tasks"
+
+    id = Column(String, primary_key=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    title = Column(String)
+    description = Column(String, nullable=True)
+    deadline = Column(DateTime, nullable=True)
+    priority = Column(String)
+    category = Column(String)
+    completed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    estimated_minutes = Column(Integer)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_archived_tasks_user_completed_at", "user_id", "completed_at"),
+    )
+
+class TaskTombstone(Base):
+    """Remembers deleted task IDs so delta-sync clients can drop them locally."""
+    __tablename__ = "task_tombstones"
+
+    id = Column(String, primary_key=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, default=DEFAULT_USER_ID)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_task_tombstones_user_deleted_at", "user_id", "deleted_at"),
+    )
+
+class DailyWorkload(Base):
+    """Per-user, per-day rollup of open tasks, kept in step with every task write."""
+    __tablename__ = "daily_workload"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    high_count = Column(Integer, default=0, nullable=False)
+    medium_count = Column(Integer, default=0, nullable=False)
+    low_count = Column(Integer, default=0, nullable=False)
+    weighted_score = Column(Integer, default=0, nullable=False)  # 15/10/5 per high/medium/low
+    total_minutes = Column(Integer, default=0, nullable=False)
+
+class CompletionRollup(Base):
+    """
+    Completed tasks per user, period, priority and category. Kept in step with every
+    task write like DailyWorkload, and untouched by archiving, so Insights never
+    reads tasks or archived_tasks.
+    """
+    __tablename__ = "completion_rollups"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    period = Column(String, primary_key=True)        # day, week
+    period_start = Column(Date, primary_key=True)    # the day, or the Monday of the week
+    priority = Column(String, primary_key=True)
+    category = Column(String, primary_key=True)
+    completed_count = Column(Integer, default=0, nullable=False)
+    total_minutes = Column(Integer, default=0, nullable=False)
+
+class BusyBlock(Base):
+    """A fixed commitment (class, meeting, commute) the time-blocker must plan around."""
+    __tablename__ = "busy_blocks"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, default=DEFAULT_USER_ID)
+    title = Column(String, nullable=True)
+    start = Column(DateTime, nullable=False)
+    end = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_busy_blocks_user_start", "user_id", "start"),
+    )
+
+class NotificationOutbox(Base):
+    """
+    Durable queue of outgoing SMS and calls. Rows are written in the same
+    transaction as whatever caused them and drained by engines/notifier.
+    """
+    __tablename__ = "notification_outbox"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    idempotency_key = Column(String, nullable=False, unique=True)
+    channel = Column(String, nullable=False)   # sms, call
+    to_number = Column(String, nullable=False)
+    body = Column(String, nullable=True)       # SMS text
+    url = Column(String, nullable=True)        # TwiML webhook for calls
+    twiml = Column(String, nullable=True)      # Call script rendered at enqueue, served by /api/voice/start
+    status = Column(String, default="pending", nullable=False)  # pending, sending, sent, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    claimed_by = Column(String, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+    provider_sid = Column(String, nullable=True)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # The drain loop asks for due rows in order
+        Index("ix_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+class SchedulerLease(Base):
+    """
+    Leader lock for the job scheduler. Every worker process races for the row;
+    only the holder runs jobs, and a lease that stops being renewed expires.
+    """
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
 class UserReflection(Base):
     __tablename__ = "user_reflections"
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, default=DEFAULT_USER_ID)
     date = Column(DateTime, default=datetime.utcnow)
     transcribed_query = Column(String, nullable=False)
-    used_in_suggestions = Column(Boolean, default=False)
\ No newline at end of file
+    used_in_suggestions = Column(Boolean, default=False)
+
+    __table_args__ = (
+        # Burnout engine: newest reflection not yet turned into a suggestion
+        Index(
+            "ix_user_reflections_user_unused_date", "user_id", "date",
+            sqlite_where=text("used_in_suggestions = 0"), postgresql_where=text("used_in_suggestions = false"),
+        ),
+    )
@@ -1,6 +1,7 @@
 from fastapi import APIRouter
-from schemas import SmartCaptureRequest, TaskBase
-from engines.capture_engine import parse_smart_input
+from typing import List
+from schemas import SmartCaptureRequest, SmartCaptureBatchRequest, TaskBase
+from engines.capture_engine import parse_smart_input, parse_many, capture_stats
 from datetime import datetime
 
 router = APIRouter(prefix="/api/capture", tags=["Smart Capture"])
@@ -13,4 +14,16 @@ async def capture_input(req: SmartCaptureRequest):
     # Pass BOTH the text and the current_time to the AI engine
     parsed_data = await parse_smart_input(req.text, current_time)
     
-    return TaskBase(**parsed_data)
\ No newline at end of file
+    return TaskBase(**parsed_data)
+
+@router.post("/batch", response_model=List[TaskBase])
+async def capture_batch(req: SmartCaptureBatchRequest):
+    """Parses a pasted list in one round trip; items needing the LLM share one completion."""
+    current_time = datetime.utcnow()
+    parsed = await parse_many(req.texts, current_time)
+    return [TaskBase(**p) for p in parsed]
+
+@router.get("/stats")
+def get_capture_stats():
+    """How often captures skipped the LLM (local fast path or cache) and the latency that saved."""
+    return capture_stats()
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from database import get_current_user_id
+from engines.event_bus import event_bus
+
+router = APIRouter(prefix="/api/events", tags=["Events"])
+
+@router.get("")
+async def stream_events(
+    last_event_id: Optional[str] = Header(None),
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Server-Sent Events feed of task.created / task.updated / task.deleted,
+    tasks.bulk_created / tasks.bulk_updated / tasks.imported and planner.invalidated.
+    Reconnect with Last-Event-ID to pick up where you left off;
+    a "reset" event means the gap couldn't be replayed and the client should refetch.
+    """
+    return StreamingResponse(
+        event_bus.stream(user_id, last_event_id),
+        media_type="text/event-stream",
+        # Keep proxies (ngrok, nginx) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/stats")
+def get_event_stats():
+    """Connected clients and the newest event id."""
+    return event_bus.stats()
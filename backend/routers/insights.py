@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db, get_current_user_id
+from datetime import datetime, timedelta
+import schemas
+from engines.workload_rollups import completions_between, week_start
+
+router = APIRouter(prefix="/api/insights", tags=["Insights"])
+
+def _add(stats: schemas.CompletionStats, bucket):
+    stats.completed_count += bucket.completed_count
+    stats.total_minutes += bucket.total_minutes
+    stats.by_priority[bucket.priority] = stats.by_priority.get(bucket.priority, 0) + bucket.completed_count
+    stats.by_category[bucket.category] = stats.by_category.get(bucket.category, 0) + bucket.completed_count
+
+@router.get("", response_model=schemas.InsightsResponse)
+async def get_insights(
+    days: int = Query(14, ge=1, le=90),
+    weeks: int = Query(8, ge=1, le=52),
+    db: AsyncSession = Depends(get_async_db),
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Completed tasks and minutes per day and per week, split by priority and category.
+    Read purely from the completion rollups, so archived tasks still count and no
+    task table is scanned however long the history gets.
+    """
+    today = datetime.utcnow().date()
+    first_day = today - timedelta(days=days - 1)
+    this_week = week_start(today)
+    first_week = this_week - timedelta(weeks=weeks - 1)
+
+    # Every day and week in range appears, empty ones included, so charts need no gap filling
+    per_day = {first_day + timedelta(days=d): schemas.InsightsDay(day=first_day + timedelta(days=d))
+               for d in range(days)}
+    per_week = {first_week + timedelta(weeks=w): schemas.InsightsWeek(week_start=first_week + timedelta(weeks=w))
+                for w in range(weeks)}
+    totals = schemas.CompletionStats()
+
+    for bucket in await completions_between(db, user_id, "day", first_day, today):
+        _add(per_day[bucket.period_start], bucket)
+    for bucket in await completions_between(db, user_id, "week", first_week, this_week):
+        _add(per_week[bucket.period_start], bucket)
+        _add(totals, bucket)
+
+    return schemas.InsightsResponse(
+        generated_at=datetime.utcnow(),
+        days=list(per_day.values()),
+        weeks=list(per_week.values()),
+        totals=totals,
+    )
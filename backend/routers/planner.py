@@ -1,41 +1,176 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from database import get_db
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db, get_current_user_id
+from typing import Optional
+from datetime import datetime, timedelta, time
 import models, schemas
-from engines.scheduling_engine import calculate_priority_score
+from engines.scheduling_engine import calculate_priority_scores, top_k_indices
 from engines.burnout_engine import analyze_workload
+from engines.workload_rollups import workload_between
+from engines.metrics import count, span
+from engines.planner_cache import bump_version, current_version, planner_cache
+from engines.recurrence import open_occurrences
+from engines.serialization import TASK_COLUMNS, dumps, json_response, task_dict, task_row
+from engines.timeblock_engine import build_timeline, timeline_store
 
 router = APIRouter(prefix="/api/planner", tags=["Intelligent Planner"])
 
 @router.get("/daily", response_model=schemas.DailyPlannerResponse)
-async def get_daily_planner(db: Session = Depends(get_db)):
+async def get_daily_planner(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, description="Return only the N most urgent tasks"),
+    db: AsyncSession = Depends(get_async_db),
+    user_id: str = Depends(get_current_user_id),
+):
     today = datetime.utcnow()
     next_week = today + timedelta(days=7)
+
+    # 0. Serve the encoded body from memory unless a task or reflection was written since the last build
+    cache_key = planner_cache.key_for(user_id, await current_version(db, user_id), today.date(), limit)
+    cached = planner_cache.get(cache_key)
+    if cached is not None:
+        count("planner_cache", result="hit")
+        return json_response(request, body=cached, headers={"X-Planner-Cache": "hit"})
+    count("planner_cache", result="miss")
     
-    # 1. Fetch upcoming active tasks
-    db_tasks = db.query(models.Task).filter(
-        models.Task.completed == False,
-        models.Task.deadline >= today,
-        models.Task.deadline <= next_week
-    ).all()
+    # 1. Fetch upcoming active tasks (just the response's columns, as plain rows)
+    with span("planner_db_fetch"):
+        db_tasks = (await db.execute(select(*TASK_COLUMNS).where(
+            models.Task.user_id == user_id,
+            models.Task.completed == False,
+            models.Task.recurrence.is_(None),
+            models.Task.deadline >= today,
+            models.Task.deadline <= next_week
+        ))).all()
+        # Habit series are expanded for this week only; completed or edited occurrences came back above
+        db_tasks += [task_row(o) for o in await open_occurrences(db, user_id, today, next_week)]
     
-    task_responses = [schemas.TaskResponse.model_validate(t) for t in db_tasks]
+    # 2. Apply Scheduling Engine (Score every task in one vectorized pass)
+    with span("planner_scoring"):
+        scores = calculate_priority_scores(
+            [t.deadline for t in db_tasks], [t.priority for t in db_tasks], today
+        )
     
-    # 2. Apply Scheduling Engine (Calculate Dynamic Priority)
-    for task in task_responses:
-        task.priority_score = calculate_priority_score(task, today)
-        
-    # 3. Sort by cognitive priority
-    task_responses.sort(key=lambda x: x.priority_score, reverse=True)
+    # 3. Rank by cognitive priority (partial sort when only the top N are wanted)
+    with span("planner_sort"):
+        order = top_k_indices(scores, limit or len(db_tasks)).tolist()
     
-    # 4. Apply Burnout Engine (Now Async and uses DB for Voice Context)
-    score, is_burnout, suggestions = await analyze_workload(task_responses, db)
+    # 4. Apply Burnout Engine on the full week, not just the returned slice
+    with span("planner_burnout"):
+        ranked = set(order)
+        workload = [db_tasks[i] for i in order] + [t for i, t in enumerate(db_tasks) if i not in ranked]
+        score, is_burnout, suggestions = await analyze_workload(workload, db, user_id, today)
     
-    return schemas.DailyPlannerResponse(
-        date=today,
-        workload_score=score,
-        burnout_warning=is_burnout,
-        tasks=task_responses,
-        ai_suggestions=suggestions
-    )
\ No newline at end of file
+    with span("planner_serialize"):
+        body = dumps({
+            "date": today,
+            "workload_score": score,
+            "burnout_warning": is_burnout,
+            "tasks": [task_dict(db_tasks[i], float(scores[i])) for i in order],
+            "ai_suggestions": suggestions,
+        })
+    planner_cache.set(cache_key, body)
+    return json_response(request, body=body, headers={"X-Planner-Cache": "miss"})
+
+
+@router.get("/forecast", response_model=schemas.WorkloadForecastResponse)
+async def get_workload_forecast(
+    weeks: int = Query(4, ge=1, le=26),
+    db: AsyncSession = Depends(get_async_db),
+    user_id: str = Depends(get_current_user_id),
+):
+    """Week-by-week burnout outlook, read purely from the per-day workload rollups."""
+    today = datetime.utcnow().date()
+    rollups = await workload_between(db, user_id, today, today + timedelta(days=weeks * 7 - 1))
+
+    forecast = [schemas.WorkloadWeek(week_start=today + timedelta(weeks=w)) for w in range(weeks)]
+    peaks = [0] * weeks
+    for day in rollups:
+        w = (day.day - today).days // 7
+        week = forecast[w]
+        week.high_count += day.high_count
+        week.medium_count += day.medium_count
+        week.low_count += day.low_count
+        week.workload_score += day.weighted_score
+        week.total_minutes += day.total_minutes
+        if day.weighted_score > peaks[w]:
+            peaks[w], week.peak_day = day.weighted_score, day.day
+
+    for week in forecast:
+        # Same 50-point threshold the daily planner applies to its 7-day window
+        week.burnout_warning = week.workload_score > 50
+    return schemas.WorkloadForecastResponse(generated_at=datetime.utcnow(), weeks=forecast)
+
+@router.get("/timeline", response_model=schemas.TimelineResponse)
+async def get_timeline(
+    days: int = Query(7, ge=1, le=14),
+    start_hour: int = Query(9, ge=0, le=23),
+    end_hour: int = Query(18, ge=1, le=24),
+    db: AsyncSession = Depends(get_async_db),
+    user_id: str = Depends(get_current_user_id),
+):
+    """Turns the ranked task list into concrete calendar blocks within working hours."""
+    if end_hour <= start_hour:
+        raise HTTPException(status_code=400, detail="end_hour must be after start_hour")
+
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    key = (now.date(), days, start_hour, end_hour)
+    version = await current_version(db, user_id)
+
+    # 1. This worker's task writes patch the stored timeline in place, so only rebuild on a new
+    # day or window, after a write elsewhere, or once the stored one has aged out
+    timeline = timeline_store.get(user_id, key, version)
+    if timeline is None:
+        window_end = datetime.combine(now.date() + timedelta(days=days), time.min)
+        db_tasks = (await db.scalars(select(models.Task).where(
+            models.Task.user_id == user_id,
+            models.Task.completed == False,
+            models.Task.recurrence.is_(None),
+            models.Task.deadline >= now,
+            models.Task.deadline <= window_end
+        ))).all()
+        db_tasks += await open_occurrences(db, user_id, now, window_end)
+        busy = (await db.execute(select(models.BusyBlock.start, models.BusyBlock.end).where(
+            models.BusyBlock.user_id == user_id,
+            models.BusyBlock.end > now,
+            models.BusyBlock.start < window_end
+        ))).all()
+
+        # 2. Rank, then pack the most urgent tasks into the earliest free slots
+        scores = calculate_priority_scores(
+            [t.deadline for t in db_tasks], [t.priority for t in db_tasks], now
+        )
+        ranked = [db_tasks[i] for i in top_k_indices(scores, len(db_tasks))]
+        timeline = build_timeline(
+            ranked, now, days,
+            work_start=time(start_hour),
+            work_end=time(end_hour) if end_hour < 24 else time.max,
+            busy=[tuple(b) for b in busy],
+        )
+        timeline_store.put(user_id, key, version, timeline)
+
+    return schemas.TimelineResponse(
+        start=timeline.start,
+        end=timeline.end,
+        blocks=timeline.to_blocks(),
+        unscheduled=list(timeline.unscheduled),
+    )
+
+@router.post("/busy", response_model=schemas.BusyBlockResponse, status_code=201)
+async def add_busy_block(
+    block: schemas.BusyBlockCreate,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: str = Depends(get_current_user_id),
+):
+    """Blocks out time the timeline must not schedule tasks into."""
+    if block.end <= block.start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+
+    db_block = models.BusyBlock(**block.model_dump(), user_id=user_id)
+    db.add(db_block)
+    # Other workers' timelines must not keep scheduling into this block
+    await bump_version(db, user_id)
+    await db.commit()
+    timeline_store.invalidate(user_id)
+    return db_block
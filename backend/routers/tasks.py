@@ -1,39 +1,423 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+import base64
+import hashlib
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from types import SimpleNamespace
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional
+from database import get_async_db, get_current_user_id
 import models, schemas
+from engines.event_bus import event_bus
+from engines.data_transfer import TABLES, export_ndjson, import_ndjson
+from engines.planner_cache import bump_version
+from engines.recurrence import add_exdate, is_occurrence, materialize, parse_occurrence_id
+from engines.serialization import TASK_COLUMNS, json_response, task_dict
+from engines.timeblock_engine import timeline_store
+from engines.workload_rollups import TaskLoad, apply_task_delta, apply_task_deltas, task_load
 
 # Define the prefix here once. 
 # In main.py, use: app.include_router(tasks.router) WITHOUT a prefix there.
 router = APIRouter(prefix="/api/tasks", tags=["Tasks"])
 
+def _encode_cursor(task: models.Task) -> str:
+    raw = f"{task.created_at.isoformat()}|{task.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, task_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), task_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def _tasks_etag(db: AsyncSession, user_id: str, *params) -> str:
+    """
+    Fingerprints the user's tasks from two index-backed MAX() lookups.
+    Every insert/update bumps updated_at and every delete writes a tombstone,
+    so the pair only changes when the data does.
+    """
+    last_write = await db.scalar(select(func.max(models.Task.updated_at)).where(models.Task.user_id == user_id))
+    last_delete = await db.scalar(
+        select(func.max(models.TaskTombstone.deleted_at)).where(models.TaskTombstone.user_id == user_id)
+    )
+    raw = "|".join(str(p) for p in (user_id, last_write, last_delete, *params))
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()}"'
+
+def _not_modified(request: Request, etag: str) -> bool:
+    return etag in request.headers.get("if-none-match", "")
+
+def _publish(user_id: str, event: str, payload: dict):
+    """Tells the user's SSE clients about a committed write; every task write also stales the planner."""
+    event_bus.publish(user_id, event, payload)
+    event_bus.publish(user_id, "planner.invalidated", {"reason": event})
+
+def _task_payload(task) -> dict:
+    return schemas.TaskResponse.model_validate(task).model_dump(mode="json")
+
+def _timeline_changed(task, version: int, before: Optional[TaskLoad] = None):
+    """A series write moves every occurrence, so it rebuilds the timeline; anything else is patched in place."""
+    if task.recurrence or (before and before.recurrence):
+        timeline_store.invalidate(task.user_id)
+    else:
+        timeline_store.task_changed(task, version)
+
+async def _get_series(db: AsyncSession, user_id: str, task_id: str):
+    """(open series, occurrence time) when task_id names one of its occurrences, else (None, None)."""
+    parsed = parse_occurrence_id(task_id)
+    if parsed is None:
+        return None, None
+    series = await db.get(models.Task, parsed[0], with_for_update=True)
+    if (not series or series.user_id != user_id or not series.recurrence or series.completed
+            or not is_occurrence(series, parsed[1])):
+        return None, None
+    return series, parsed[1]
+
+async def _get_or_materialize(db: AsyncSession, user_id: str, task_id: str):
+    """
+    The task to edit and its load before the edit. A habit occurrence that only
+    existed virtually gets its row now, so its load before is None.
+    """
+    # Locked until commit, so a concurrent edit can't take the same "before" off the rollups twice
+    db_task = await db.get(models.Task, task_id, with_for_update=True)
+    # Someone else's task is as good as missing
+    if db_task and db_task.user_id == user_id:
+        return db_task, task_load(db_task)
+    series, at = await _get_series(db, user_id, task_id)
+    if series is None:
+        raise HTTPException(status_code=404, detail=f"Task with ID {task_id} not found")
+    db_task = materialize(series, at)
+    db.add(db_task)
+    return db_task, None
+
+async def _commit_occurrences(db: AsyncSession):
+    """Commits, turning a lost race to materialize the same occurrence into a 409."""
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="That occurrence was just saved elsewhere; fetch it and retry")
+
 @router.post("/", response_model=schemas.TaskResponse, status_code=201)
-def create_task(task: schemas.TaskCreate, db: Session = Depends(get_db)):
-    """Creates a new task in the database."""
-    db_task = models.Task(**task.model_dump())
+async def create_task(
+    task: schemas.TaskCreate,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: str = Depends(get_current_user_id),
+):
+    """Creates a new task for the current user."""
+    db_task = models.Task(**task.model_dump(), user_id=user_id,
+                          completed_at=datetime.utcnow() if task.completed else None)
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+    await apply_task_delta(db, None, task_load(db_task))
+    version = await bump_version(db, user_id)
+    await db.commit()
+    await db.refresh(db_task)
+    _timeline_changed(db_task, version)
+    _publish(user_id, "task.created", _task_payload(db_task))
     return db_task
 
 @router.get("/", response_model=List[schemas.TaskResponse])
-def get_tasks(db: Session = Depends(get_db)):
-    """Fetches all tasks."""
-    return db.query(models.Task).all()
+async def get_tasks(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Fetches tasks ordered by (created_at, id).
+    Pass ?limit= to page through them; the next page's cursor comes back in X-Next-Cursor.
+    Without a limit every task is returned, as before.
+    """
+    etag = await _tasks_etag(db, user_id, "list", limit, cursor)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    headers = {"ETag": etag}
+
+    # Just the response's columns as plain rows: no ORM objects, no Pydantic round trip
+    query = select(*TASK_COLUMNS).where(models.Task.user_id == user_id)
+    if cursor:
+        created_at, task_id = _decode_cursor(cursor)
+        query = query.where(or_(
+            models.Task.created_at > created_at,
+            and_(models.Task.created_at == created_at, models.Task.id > task_id),
+        ))
+    query = query.order_by(models.Task.created_at, models.Task.id)
+
+    if limit is None:
+        rows = (await db.execute(query)).all()
+    else:
+        # Fetch one extra row to learn whether another page exists
+        rows = (await db.execute(query.limit(limit + 1))).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            headers["X-Next-Cursor"] = _encode_cursor(rows[-1])
+    return json_response(request, [task_dict(row) for row in rows], headers=headers)
+
+@router.get("/sync", response_model=schemas.TaskSyncResponse)
+async def sync_tasks(
+    request: Request,
+    updated_since: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: str = Depends(get_current_user_id),
+):
+    """Returns only tasks changed or deleted after the client's watermark."""
+    etag = await _tasks_etag(db, user_id, "sync", updated_since)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    task_query = select(*TASK_COLUMNS, models.Task.updated_at).where(models.Task.user_id == user_id)
+    tombstone_query = select(models.TaskTombstone.id, models.TaskTombstone.deleted_at).where(
+        models.TaskTombstone.user_id == user_id
+    )
+    if updated_since:
+        task_query = task_query.where(models.Task.updated_at > updated_since)
+        tombstone_query = tombstone_query.where(models.TaskTombstone.deleted_at > updated_since)
+
+    changed = (await db.execute(task_query.order_by(models.Task.updated_at))).all()
+    deleted = (await db.execute(tombstone_query)).all()
+
+    stamps = [t.updated_at for t in changed] + [t.deleted_at for t in deleted]
+    return json_response(request, {
+        # updated_at rides along for the watermark; task_dict stops at TaskResponse's columns
+        "tasks": [task_dict(row) for row in changed],
+        "deleted_ids": [t.id for t in deleted],
+        "watermark": max(stamps) if stamps else updated_since,
+    }, headers={"ETag": etag})
+
+@router.get("/export")
+async def export_tasks(
+    include: List[str] = Query(["task", "reflection"]),
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Streams the user's tasks and reflections as NDJSON straight off a server-side cursor.
+    ?include=task or ?include=reflection narrows it to one table.
+    """
+    unknown = set(include) - set(TABLES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown record types: {', '.join(sorted(unknown))}")
+    return StreamingResponse(
+        export_ndjson(user_id, [kind for kind in TABLES if kind in include]),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="focusflow-export.ndjson"'},
+    )
+
+@router.post("/import", response_model=schemas.ImportResponse)
+async def import_tasks(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Loads an NDJSON body (the export format) into the current user's account as it
+    streams in, committing every few thousand rows. IDs that already exist are
+    skipped, so re-running is safe.
+    """
+    try:
+        result = await import_ndjson(db, user_id, request.stream())
+    finally:
+        # Chunks commit as they go, so even a failed import may have written tasks;
+        # roll back whatever a failed chunk left open before recording that
+        await db.rollback()
+        await bump_version(db, user_id)
+        await db.commit()
+        timeline_store.invalidate(user_id)
+    # Too many rows to push one by one; clients refetch
+    _publish(user_id, "tasks.imported", {"tasks": result["tasks"]["inserted"], "reflections": result["reflections"]["inserted"]})
+    return result
+
+@router.post("/bulk", response_model=schemas.BulkResponse, status_code=201)
+async def create_tasks_bulk(
+    req: schemas.BulkTaskCreateRequest,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: str = Depends(get_current_user_id),
+):
+    """Imports a whole task list with one multi-row INSERT and a single commit."""
+    now = datetime.utcnow()
+    rows = [{**t.model_dump(), "id": str(uuid.uuid4()), "user_id": user_id, "created_at": now, "updated_at": now,
+             "completed_at": now if t.completed else None}
+            for t in req.tasks]
+
+    await db.execute(insert(models.Task), rows)
+    await apply_task_deltas(db, [(None, task_load(SimpleNamespace(**row))) for row in rows])
+    version = await bump_version(db, user_id)
+    await db.commit()
+
+    results = []
+    for i, row in enumerate(rows):
+        task = models.Task(**row)
+        _timeline_changed(task, version)
+        results.append(schemas.BulkItemResult(
+            index=i, id=row["id"], status="created", task=schemas.TaskResponse.model_validate(task)
+        ))
+    # One event for the whole batch so a 1000-task import can't overflow a client's buffer
+    _publish(user_id, "tasks.bulk_created", {"tasks": [r.task.model_dump(mode="json") for r in results]})
+    return schemas.BulkResponse(succeeded=len(rows), failed=0, results=results)
+
+@router.patch("/bulk", response_model=schemas.BulkResponse)
+async def update_tasks_bulk(
+    req: schemas.BulkTaskUpdateRequest,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Applies many edits (e.g. every accepted burnout suggestion) in one transaction.
+    Identical change sets share one UPDATE ... WHERE id IN (...); the rest go out as one executemany.
+    """
+    # 1. Fold repeated IDs so each row is written once, last change winning
+    merged: Dict[str, dict] = {}
+    for item in req.items:
+        merged.setdefault(item.id, {}).update(item.changes.model_dump(exclude_unset=True))
+
+    # 2. One SELECT for the current state of every row we're about to touch, locked until commit
+    #    so concurrent edits can't both subtract the same "before" from the rollups
+    current = {t.id: task_load(t) for t in (await db.scalars(
+        select(models.Task).where(models.Task.user_id == user_id, models.Task.id.in_(list(merged)))
+        .order_by(models.Task.id).with_for_update()
+    )).all()}
+    now = datetime.utcnow()
+    deltas = []
+
+    # 3. Habit occurrences that only exist virtually get their rows, edits applied, in the same transaction
+    virtual = {}
+    for task_id in merged.keys() - current.keys():
+        parsed = parse_occurrence_id(task_id)
+        if parsed and merged[task_id]:
+            virtual[task_id] = parsed
+    series = {t.id: t for t in (await db.scalars(select(models.Task).where(
+        models.Task.user_id == user_id,
+        models.Task.id.in_({series_id for series_id, _ in virtual.values()}),
+        models.Task.recurrence.isnot(None),
+        models.Task.completed == False
+    ).with_for_update())).all()} if virtual else {}
+    materialized = []
+    for task_id, (series_id, at) in virtual.items():
+        if series_id not in series or not is_occurrence(series[series_id], at):
+            continue
+        task = materialize(series[series_id], at)
+        for key, value in merged[task_id].items():
+            setattr(task, key, value)
+        task.completed_at = now if task.completed else None
+        task.updated_at = now
+        db.add(task)
+        materialized.append(task_id)
+        deltas.append((None, task_load(task)))
+
+    groups = defaultdict(list)
+    for task_id, changes in merged.items():
+        if task_id not in current or not changes:
+            continue
+        before = current[task_id]
+        # completed_at follows completed: stamped when it flips on, cleared when it flips off
+        if "completed" in changes and bool(changes["completed"]) != before.completed:
+            changes = {**changes, "completed_at": now if changes["completed"] else None}
+        groups[tuple(sorted(changes.items()))].append(task_id)
+        after = {**before._asdict(), **{k: v for k, v in changes.items() if k in TaskLoad._fields}}
+        deltas.append((before, task_load(SimpleNamespace(**after))))
+
+    # 4. Set-based writes
+    per_row = []
+    for changes, ids in groups.items():
+        values = {**dict(changes), "updated_at": now}
+        if len(ids) > 1:
+            await db.execute(
+                update(models.Task).where(models.Task.id.in_(ids)).values(**values),
+                execution_options={"synchronize_session": False},
+            )
+        else:
+            per_row.append({"id": ids[0], **values})
+    if per_row:
+        await db.execute(update(models.Task), per_row)
+
+    await apply_task_deltas(db, deltas)
+    version = await bump_version(db, user_id)
+    await _commit_occurrences(db)
+
+    # 5. Re-read the written rows once for the response and the timeline
+    touched = [task_id for ids in groups.values() for task_id in ids] + materialized
+    fresh = {t.id: t for t in (await db.scalars(
+        select(models.Task).where(models.Task.id.in_(touched)).execution_options(populate_existing=True)
+    )).all()} if touched else {}
+    for task in fresh.values():
+        _timeline_changed(task, version, current.get(task.id))
+
+    results = []
+    for i, item in enumerate(req.items):
+        if item.id not in current and item.id not in fresh:
+            results.append(schemas.BulkItemResult(index=i, id=item.id, status="not_found"))
+            continue
+        task = fresh.get(item.id)
+        results.append(schemas.BulkItemResult(
+            index=i, id=item.id, status="updated" if task else "unchanged",
+            task=schemas.TaskResponse.model_validate(task) if task else None,
+        ))
+    failed = sum(r.status == "not_found" for r in results)
+    if fresh:
+        _publish(user_id, "tasks.bulk_updated", {"tasks": [_task_payload(t) for t in fresh.values()]})
+    return schemas.BulkResponse(succeeded=len(results) - failed, failed=failed, results=results)
 
 @router.patch("/{task_id}", response_model=schemas.TaskResponse)
-def update_task(task_id: int, updates: schemas.TaskUpdate, db: Session = Depends(get_db)):
-    """Updates an existing task. Changed task_id to int to match standard DB IDs."""
-    db_task = db.query(models.Task).filter(models.Task.id == task_id).first()
-    
-    if not db_task:
-        raise HTTPException(status_code=404, detail=f"Task with ID {task_id} not found")
+async def update_task(
+    task_id: str,
+    updates: schemas.TaskUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Updates an existing task. Task IDs are UUID strings; a habit occurrence's ID
+    ("<series id>@<time>") works too and saves the occurrence as its own row.
+    """
+    db_task, before = await _get_or_materialize(db, user_id, task_id)
         
     update_data = updates.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_task, key, value)
+    if bool(db_task.completed) != (before.completed if before else False):
+        db_task.completed_at = datetime.utcnow() if db_task.completed else None
         
-    db.commit()
-    db.refresh(db_task)
-    return db_task
\ No newline at end of file
+    await apply_task_delta(db, before, task_load(db_task))
+    version = await bump_version(db, user_id)
+    await _commit_occurrences(db)
+    await db.refresh(db_task)
+    _timeline_changed(db_task, version, before)
+    _publish(user_id, "task.updated", _task_payload(db_task))
+    return db_task
+
+@router.delete("/{task_id}", status_code=204)
+async def delete_task(
+    task_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Deletes a task and leaves a tombstone behind for delta-sync clients.
+    Deleting a habit occurrence, virtual or saved, also excludes it from its series.
+    """
+    db_task = await db.get(models.Task, task_id, with_for_update=True)
+    if db_task and db_task.user_id == user_id:
+        series = await db.get(models.Task, db_task.series_id, with_for_update=True) if db_task.series_id else None
+        at = db_task.occurrence_at
+        await apply_task_delta(db, task_load(db_task), None)
+        await db.delete(db_task)
+        await db.merge(models.TaskTombstone(id=task_id, user_id=user_id, deleted_at=datetime.utcnow()))
+    else:
+        db_task = None
+        series, at = await _get_series(db, user_id, task_id)
+        if series is None:
+            raise HTTPException(status_code=404, detail=f"Task with ID {task_id} not found")
+    if series is not None and series.recurrence:
+        # Otherwise the next expansion would bring the occurrence straight back
+        series.recurrence = add_exdate(series.recurrence, at)
+    version = await bump_version(db, user_id)
+    await db.commit()
+    if db_task and db_task.recurrence:
+        timeline_store.invalidate(user_id)
+    else:
+        timeline_store.task_removed(user_id, task_id, version)
+    _publish(user_id, "task.deleted", {"id": task_id})
+    return Response(status_code=204)
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db, get_current_user_id
+import models, schemas
+
+router = APIRouter(prefix="/api/users", tags=["Users"])
+
+@router.post("/", response_model=schemas.UserResponse, status_code=201)
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    """Registers a user. Send the returned id as X-User-Id on every other request."""
+    db_user = models.User(**user.model_dump())
+    db.add(db_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="Phone number already registered")
+    await db.refresh(db_user)
+    return db_user
+
+@router.get("/me", response_model=schemas.UserResponse)
+async def get_me(db: AsyncSession = Depends(get_async_db), user_id: str = Depends(get_current_user_id)):
+    return await db.get(models.User, user_id)
@@ -1,68 +1,89 @@
-from fastapi import APIRouter, Request, Depends
+from fastapi import APIRouter, BackgroundTasks, Request
 from fastapi.responses import Response
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import select
+from database import AsyncSessionLocal
 import models
-import os
-from openai import AsyncOpenAI
+from engines.call_scripts import NO_UPDATE_TWIML, NOTED_TWIML, call_scripts, fallback_start
+from engines.event_bus import event_bus
+from engines.metrics import count, span
+from engines.planner_cache import bump_version
 
 router = APIRouter(prefix="/api/voice", tags=["Voice Agent"])
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-# Retrieve the public URL from environment variables
-BASE_URL = os.getenv("NGROK_URL")
-
-def generate_twiml(content: str):
-    """Helper to wrap TwiML in clean XML with correct headers."""
-    xml_output = f'<?xml version="1.0" encoding="UTF-8"?><Response>{content}</Response>'
+def generate_twiml(xml_output: str):
+    """Helper to send rendered TwiML with correct headers."""
     return Response(content=xml_output, media_type="application/xml")
 
-@router.post("/start")
-async def voice_start(request: Request, db: Session = Depends(get_db)):
-    """A direct reminder call that lists tasks and captures one update."""
-    
-    # 1. Fetch incomplete tasks
-    pending_tasks = db.query(models.Task).filter(
-        models.Task.completed == False
-    ).limit(3).all()
-    
-    # 2. Build the Reminder Script
-    if not pending_tasks:
-        script = "Namaste! This is Focus Flow. You have no pending tasks today. Excellent job! Do you have any quick notes for tomorrow?"
-    else:
-        task_names = ", ".join([t.title for t in pending_tasks])
-        script = f"Namaste! This is your reminder. You still have {task_names} pending. Please update them in the app. Anything to add for tomorrow's plan?"
+async def _call_user_id(db, request: Request, form) -> str:
+    """
+    Whose call this is. Calls we place carry ?user= on the webhook URL; otherwise
+    the user's side of the call is matched against users' phone numbers. On an
+    inbound call that is the caller ("From"); "To" is our own Twilio number.
+    """
+    user_id = request.query_params.get("user")
+    if user_id:
+        return user_id
+    phone = form.get("To") if form.get("Direction", "").startswith("outbound") else form.get("From")
+    if phone:
+        user_id = await db.scalar(select(models.User.id).where(models.User.phone_number == phone))
+    return user_id or models.DEFAULT_USER_ID
 
-    # 3. Quick Gather (Trial friendly: short timeout)
-    content = f"""
-    <Gather input="speech" action="{BASE_URL}/api/voice/respond" method="POST" speechTimeout="3" language="en-IN">
-        <Say voice="Polly.Aditi" language="en-IN">{script}</Say>
-    </Gather>
-    <Say voice="Polly.Aditi" language="en-IN">I didn't hear anything. Keeping your schedule as is. Goodnight!</Say>
-    <Hangup/>
+@router.post("/start")
+async def voice_start(request: Request):
+    """
+    A direct reminder call that lists tasks and captures one update. The script
+    was rendered when the call was queued; this only looks it up.
     """
-    return generate_twiml(content)
+    with span("voice_form_parse", webhook="start"):
+        form_data = await request.form()
+
+    # 1. Placed by this worker: the notifier filed the script under the call SID
+    twiml = call_scripts.get(form_data.get("CallSid", ""))
+    if twiml is not None:
+        count("voice_script", source="cache")
+        return generate_twiml(twiml)
+
+    # 2. Placed by another worker: the script sits on its outbox row, one primary-key read away
+    outbox_id = request.query_params.get("script")
+    if outbox_id:
+        try:
+            with span("voice_db_fetch", webhook="start"):
+                async with AsyncSessionLocal() as db:
+                    twiml = await db.scalar(select(models.NotificationOutbox.twiml).where(
+                        models.NotificationOutbox.id == outbox_id
+                    ))
+        except Exception as e:
+            print(f"⚠️ Call script lookup failed: {e}")
+        if twiml is not None:
+            count("voice_script", source="outbox")
+            return generate_twiml(twiml)
+
+    # 3. Nothing prepared (or the database is struggling): a generic prompt still takes the note
+    count("voice_script", source="fallback")
+    return generate_twiml(fallback_start(request.query_params.get("user")))
+
+async def _save_reflection(request: Request, form, user_speech: str):
+    """Runs after the TwiML has gone out; Twilio never waits on this commit."""
+    with span("voice_db_write", webhook="respond"):
+        async with AsyncSessionLocal() as db:
+            user_id = await _call_user_id(db, request, form)
+            # Save to database for the Daily Planner to see
+            db.add(models.UserReflection(transcribed_query=user_speech, user_id=user_id))
+            # The next planner load should turn this note into a suggestion
+            await bump_version(db, user_id)
+            await db.commit()
+    event_bus.publish(user_id, "planner.invalidated", {"reason": "reflection"})
 
 @router.post("/respond")
-async def voice_respond(request: Request, db: Session = Depends(get_db)):
-    """One-shot response handler: saves the note and ends the call fast."""
-    form_data = await request.form()
+async def voice_respond(request: Request, background_tasks: BackgroundTasks):
+    """One-shot response handler: ends the call fast, then saves the note."""
+    with span("voice_form_parse", webhook="respond"):
+        form_data = await request.form()
     user_speech = form_data.get("SpeechResult", "")
-    
-    if user_speech:
-        print(f"🗣️ User Note Captured: {user_speech}")
-        # Save to database for the Daily Planner to see
-        reflection = models.UserReflection(transcribed_query=user_speech)
-        db.add(reflection)
-        db.commit()
-        
-        reply = "Got it, I've noted that down. Your schedule will be updated. Goodnight!"
-    else:
-        reply = "No updates received. Goodnight!"
 
-    # End call immediately to avoid Trial timeouts
-    content = f"""
-    <Say voice="Polly.Aditi" language="en-IN">{reply}</Say>
-    <Hangup/>
-    """
-    return generate_twiml(content)
\ No newline at end of file
+    if not user_speech:
+        return generate_twiml(NO_UPDATE_TWIML)
+
+    print(f"🗣️ User Note Captured: {user_speech}")
+    background_tasks.add_task(_save_reflection, request, form_data, user_speech)
+    return generate_twiml(NOTED_TWIML)
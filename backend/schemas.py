@@ -1,6 +1,14 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
-from datetime import datetime
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, List, Optional
+from datetime import date, datetime
+
+from engines.recurrence import parse_rule
+
+def _check_rule(value: Optional[str]) -> Optional[str]:
+    """Rejects rules the expander can't run, so a bad one never reaches the planner."""
+    if value:
+        parse_rule(value)
+    return value or None
 
 class TaskBase(BaseModel):
     title: str
@@ -10,6 +18,13 @@ class TaskBase(BaseModel):
     category: str = "task"
     completed: bool = False
     estimated_minutes: Optional[int] = 30
+    # e.g. "FREQ=DAILY" or "FREQ=WEEKLY;BYDAY=MO,WE,FR"; deadline is then the first occurrence
+    recurrence: Optional[str] = None
+
+    @field_validator("recurrence")
+    @classmethod
+    def check_recurrence(cls, value: Optional[str]) -> Optional[str]:
+        return _check_rule(value)
 
 class TaskCreate(TaskBase):
     pass
@@ -20,21 +35,163 @@ class TaskUpdate(BaseModel):
     priority: Optional[str] = None
     category: Optional[str] = None
     completed: Optional[bool] = None
+    recurrence: Optional[str] = None
+
+    @field_validator("recurrence")
+    @classmethod
+    def check_recurrence(cls, value: Optional[str]) -> Optional[str]:
+        return _check_rule(value)
+
+class BulkTaskUpdate(BaseModel):
+    """One entry of PATCH /api/tasks/bulk; mirrors a burnout suggestion's taskId + changes."""
+    id: str
+    changes: TaskUpdate
+
+class BulkTaskUpdateRequest(BaseModel):
+    items: List[BulkTaskUpdate] = Field(..., min_length=1, max_length=1000)
+
+class BulkTaskCreateRequest(BaseModel):
+    tasks: List[TaskCreate] = Field(..., min_length=1, max_length=1000)
 
 class TaskResponse(TaskBase):
     id: str
     created_at: datetime
+    # Set on occurrences of a habit series, virtual or materialized
+    series_id: Optional[str] = None
     priority_score: Optional[float] = 0.0  # Appended dynamically by engine
 
     class Config:
         from_attributes = True
 
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    status: str  # created, updated, not_found
+    task: Optional[TaskResponse] = None
+
+class BulkResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
 class SmartCaptureRequest(BaseModel):
     text: str
 
+class SmartCaptureBatchRequest(BaseModel):
+    texts: List[str] = Field(..., min_length=1, max_length=100)
+
 class DailyPlannerResponse(BaseModel):
     date: datetime
     workload_score: int
     burnout_warning: bool
     tasks: List[TaskResponse]
-    ai_suggestions: List[dict]
\ No newline at end of file
+    ai_suggestions: List[dict]
+
+class TaskSyncResponse(BaseModel):
+    """Delta payload for clients that already hold a local copy of their tasks."""
+    tasks: List[TaskResponse]
+    deleted_ids: List[str]
+    watermark: Optional[datetime] = None  # Send back as ?updated_since= on the next sync
+
+class TaskImport(TaskCreate):
+    """One "task" line of an NDJSON import: the create fields plus the stored ones an export carries."""
+    id: Optional[str] = None
+    user_id: Optional[str] = None  # Ignored; imports land in the caller's account
+    deadline: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    series_id: Optional[str] = None
+    occurrence_at: Optional[datetime] = None
+
+class ReflectionImport(BaseModel):
+    """One "reflection" line of an NDJSON import."""
+    id: Optional[str] = None
+    user_id: Optional[str] = None
+    date: Optional[datetime] = None
+    transcribed_query: str
+    used_in_suggestions: bool = False
+
+class ImportCounts(BaseModel):
+    inserted: int
+    skipped: int  # ID already present
+
+class ImportLineError(BaseModel):
+    line: int
+    error: str
+
+class ImportResponse(BaseModel):
+    """Outcome of POST /api/tasks/import; only the first few bad lines are listed."""
+    tasks: ImportCounts
+    reflections: ImportCounts
+    lines: int
+    invalid: int
+    errors: List[ImportLineError]
+
+
+class BusyBlockCreate(BaseModel):
+    title: Optional[str] = None
+    start: datetime
+    end: datetime
+
+class BusyBlockResponse(BusyBlockCreate):
+    id: str
+
+    class Config:
+        from_attributes = True
+
+class TimeBlock(BaseModel):
+    task_id: str
+    title: Optional[str] = None
+    start: datetime
+    end: datetime
+
+class TimelineResponse(BaseModel):
+    start: datetime
+    end: datetime
+    blocks: List[TimeBlock]
+    unscheduled: List[str]  # Task IDs that don't fit before their deadline
+
+class WorkloadWeek(BaseModel):
+    week_start: date
+    workload_score: int = 0
+    burnout_warning: bool = False
+    high_count: int = 0
+    medium_count: int = 0
+    low_count: int = 0
+    total_minutes: int = 0
+    peak_day: Optional[date] = None
+
+class WorkloadForecastResponse(BaseModel):
+    generated_at: datetime
+    weeks: List[WorkloadWeek]
+
+class UserCreate(BaseModel):
+    name: str
+    phone_number: Optional[str] = None
+
+class UserResponse(UserCreate):
+    id: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class CompletionStats(BaseModel):
+    completed_count: int = 0
+    total_minutes: int = 0
+    by_priority: Dict[str, int] = {}
+    by_category: Dict[str, int] = {}
+
+class InsightsDay(CompletionStats):
+    day: date
+
+class InsightsWeek(CompletionStats):
+    week_start: date  # Monday
+
+class InsightsResponse(BaseModel):
+    """Completion history, served from the completion rollups only."""
+    generated_at: datetime
+    days: List[InsightsDay]
+    weeks: List[InsightsWeek]
+    totals: CompletionStats  # Across the weeks returned